@@ -0,0 +1,174 @@
+"""
+JSON API of the plugin, mounted by Airflow's API server under ``plugin.STATUS_URL_PREFIX``.
+
+``GET /status`` returns the update, EOL and yanked notices. Its ETag is worked
+out from the results committed by the last update check, the number of visible
+releases and the EOL dismissal state, which takes one small query, so a client
+revalidating with ``If-None-Match`` gets a 304 without the notices being
+computed. ``Cache-Control`` lets the browser reuse the response until the next
+update check is due, but not while a check is in progress, as its results
+could change the notices at any moment.
+
+Only the API server imports this module (see ``plugin._LazyASGIApp``).
+
+A browser that dismisses the EOL notice should fetch the status again with
+``cache: "no-cache"``, otherwise it would keep showing the notice until then.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from datetime import datetime, time, timedelta
+from typing import Any, NamedTuple
+
+from airflow.api_fastapi.auth.managers.models.resource_details import AccessView
+from airflow.api_fastapi.core_api.security import requires_access_view
+from airflow.utils.timezone import utcnow
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from astronomer.airflow.version_check.plugin import __version__, eol_warning_opt_out, update_check_interval
+
+
+class StatusState(NamedTuple):
+    """What the status served at a point in time depends on."""
+
+    runtime_version: str | None
+    last_checked: datetime | None
+    # See AstronomerVersionCheck.results_checked_at
+    results_checked_at: datetime | None
+    releases_hash: str | None
+    visible_releases: int
+    eos_dismissed_until: datetime | None
+    now: datetime
+
+    @property
+    def dismissed(self) -> bool:
+        return self.eos_dismissed_until is not None and self.now < self.eos_dismissed_until
+
+    @property
+    def check_in_progress(self) -> bool:
+        return self.last_checked is not None and self.last_checked != self.results_checked_at
+
+    def etag(self) -> str:
+        parts = [
+            __version__,
+            str(self.runtime_version),
+            self.last_checked.isoformat() if self.last_checked else "",
+            self.results_checked_at.isoformat() if self.results_checked_at else "",
+            self.releases_hash or "",
+            # hide_old_versions changes which releases are visible without a check
+            str(self.visible_releases),
+            "dismissed" if self.dismissed else "",
+            str(eol_warning_opt_out),
+            # The number of days to the end of maintenance changes daily
+            self.now.date().isoformat(),
+        ]
+        return '"{}"'.format(hashlib.sha256("|".join(parts).encode()).hexdigest()[:32])
+
+    def max_age(self) -> int:
+        """Return for how many seconds the status can be reused."""
+        if self.last_checked is None or self.check_in_progress:
+            return 0
+        expires = [datetime.combine(self.now.date() + timedelta(days=1), time(), tzinfo=self.now.tzinfo)]
+        if update_check_interval > 0:
+            expires.append(self.last_checked + timedelta(seconds=update_check_interval))
+        if self.dismissed:
+            expires.append(self.eos_dismissed_until)
+        return max(0, int((min(expires) - self.now).total_seconds()))
+
+
+def get_status_state() -> StatusState:
+    from sqlalchemy import func, select
+
+    from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion, AstronomerVersionCheck
+    from astronomer.airflow.version_check.models.replica import create_read_session
+    from astronomer.airflow.version_check.update_checks import get_runtime_version
+
+    runtime_version = get_runtime_version()
+    check_columns = (
+        AstronomerVersionCheck.last_checked,
+        AstronomerVersionCheck.results_checked_at,
+        AstronomerVersionCheck.releases_hash,
+    )
+    with create_read_session() as session:
+        last_checked, results_checked_at, releases_hash, visible_releases, eos_dismissed_until = session.execute(
+            select(
+                *(
+                    select(column).where(AstronomerVersionCheck.singleton.is_(True)).scalar_subquery()
+                    for column in check_columns
+                ),
+                select(func.count())
+                .select_from(AstronomerAvailableVersion)
+                .where(AstronomerAvailableVersion.hidden_from_ui.is_(False))
+                .scalar_subquery(),
+                select(AstronomerAvailableVersion.eos_dismissed_until)
+                .where(AstronomerAvailableVersion.version == str(runtime_version))
+                .scalar_subquery(),
+            )
+        ).one()
+    return StatusState(
+        runtime_version=runtime_version,
+        last_checked=last_checked,
+        results_checked_at=results_checked_at,
+        releases_hash=releases_hash,
+        visible_releases=visible_releases,
+        eos_dismissed_until=eos_dismissed_until,
+        now=utcnow(),
+    )
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag``, using the weak comparison it calls for."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+# The ETag of the last status computed in this process
+_last_etag: str | None = None
+_last_etag_lock = threading.Lock()
+
+
+def get_status(state: StatusState) -> dict[str, Any]:
+    global _last_etag
+
+    from astronomer.airflow.version_check.update_checks import UpdateAvailableHelper, notice_cache
+
+    etag = state.etag()
+    with _last_etag_lock:
+        if etag != _last_etag:
+            # Don't serve notices cached from before the change under the new ETag
+            notice_cache.invalidate()
+            _last_etag = etag
+    return {
+        **UpdateAvailableHelper().version_status(),
+        "last_checked": state.last_checked,
+    }
+
+
+def create_app():
+    """Return the FastAPI app of the plugin's API."""
+    app = FastAPI(title="Astronomer version check", version=__version__)
+
+    @app.get("/status", dependencies=[Depends(requires_access_view(AccessView.WEBSITE))])
+    def status(request: Request) -> Response:
+        """Return the update, EOL and yanked notices of the running version of Astronomer Runtime."""
+        state = get_status_state()
+        etag = state.etag()
+        headers = {"ETag": etag, "Cache-Control": f"private, max-age={state.max_age()}"}
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return Response(status_code=304, headers=headers)
+        return JSONResponse(jsonable_encoder(get_status(state)), headers=headers)
+
+    return app
@@ -0,0 +1,113 @@
+"""
+Retry policy for failed update checks.
+
+Failures are classified by what went wrong, and each kind is retried after a
+capped exponential backoff with "full jitter": the delay is drawn uniformly
+between zero and the current ceiling, so a fleet of schedulers that all failed
+at the same time (during an outage of the update endpoint, say) spread their
+retries out rather than hitting it again in lockstep.
+"""
+
+from __future__ import annotations
+
+import enum
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Don't let a server push the next check out by more than a day
+MAX_RETRY_AFTER = 24 * 3600
+
+
+class FailureKind(enum.Enum):
+    """Why an update check failed."""
+
+    NETWORK = enum.auto()
+    SERVER_ERROR = enum.auto()
+    RATE_LIMITED = enum.auto()
+    CONTENDED = enum.auto()
+    MALFORMED = enum.auto()
+    TOO_LARGE = enum.auto()
+    DEADLINE_EXCEEDED = enum.auto()
+    UNKNOWN = enum.auto()
+
+
+# (base, cap) of the backoff for each kind of failure, in seconds
+BACKOFF_POLICIES: dict[FailureKind, tuple[float, float]] = {
+    FailureKind.NETWORK: (60, 3600),
+    FailureKind.SERVER_ERROR: (300, 6 * 3600),
+    FailureKind.RATE_LIMITED: (300, 6 * 3600),
+    # Another process is doing the check, we only need to look again once it's done
+    FailureKind.CONTENDED: (60, 600),
+    # Retrying won't help until the document is fixed
+    FailureKind.MALFORMED: (3600, 24 * 3600),
+    FailureKind.TOO_LARGE: (3600, 24 * 3600),
+    # The endpoint (or the network to it) is slow, so give it longer than a plain network error
+    FailureKind.DEADLINE_EXCEEDED: (300, 6 * 3600),
+    FailureKind.UNKNOWN: (3600, 24 * 3600),
+}
+
+
+class UpdateCheckError(Exception):
+    """An update check failure of a known kind."""
+
+    def __init__(self, kind: FailureKind, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a ``Retry-After`` header, which is either a number of seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
+
+
+class Backoff:
+    """
+    Consecutive failure state of an update check thread.
+
+    Each kind of failure backs off according to how many failures of that
+    kind there have been, so a run of network errors doesn't make the first
+    lock contention wait for hours.
+
+    ``consecutive_failures``, ``failures_by_kind`` and ``last_failure`` can be
+    inspected to see how the checks are going; all are reset by ``success``.
+    """
+
+    def __init__(self, policies: dict[FailureKind, tuple[float, float]] = BACKOFF_POLICIES):
+        self.policies = policies
+        self.consecutive_failures = 0
+        self.failures_by_kind: dict[FailureKind, int] = {}
+        self.last_failure: FailureKind | None = None
+
+    def failure(self, kind: FailureKind, retry_after: float | None = None) -> float:
+        """Record a failure and return how long to wait before trying again."""
+        self.consecutive_failures += 1
+        attempts = self.failures_by_kind[kind] = self.failures_by_kind.get(kind, 0) + 1
+        self.last_failure = kind
+
+        base, cap = self.policies[kind]
+        ceiling = min(cap, base * 2 ** min(attempts - 1, 32))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            # The server knows better than us when it will be ready again
+            delay = max(delay, retry_after)
+        return delay
+
+    def success(self) -> None:
+        self.consecutive_failures = 0
+        self.failures_by_kind.clear()
+        self.last_failure = None
@@ -0,0 +1,127 @@
+"""
+Node-local cache of the update document.
+
+Every process on a node that runs a ``CheckThread`` (and every restart of one)
+would otherwise fetch the update document for itself. With the cache enabled
+the raw document is kept in a file, together with its validators and the time
+it was fetched, so any of them can reuse a fresh copy instead.
+
+The file starts with a one line JSON header followed by the document exactly
+as it was received. It is replaced atomically, so readers never see a partial
+write, and is read through a memory map, so the document doesn't have to be
+copied into memory to be parsed.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import time
+from typing import BinaryIO, Iterable, Iterator
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class CachedDocument:
+    """An update document read from the cache. Close it once done with the body."""
+
+    def __init__(self, body: mmap.mmap, offset: int, etag: str | None, last_modified: str | None, fetched_at: float):
+        self._body = body
+        self._offset = offset
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def chunks(self, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the document in chunks, closing it afterwards."""
+        try:
+            for start in range(self._offset, len(self._body), size):
+                yield self._body[start : start + size]
+        finally:
+            self.close()
+
+    def read(self) -> bytes:
+        try:
+            return self._body[self._offset :]
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self._body.close()
+
+
+class DocumentCache:
+    def __init__(self, path: str, max_age: float):
+        self.path = path
+        self.max_age = max_age
+
+    def load(self) -> CachedDocument | None:
+        """Return the cached document, or None if there isn't a readable one."""
+        try:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                # The mapping stays valid after the file is closed, or replaced
+                body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError as e:
+            if not isinstance(e, FileNotFoundError):
+                log.warning("Unable to read the update document cache %s: %s", self.path, e)
+            return None
+
+        end = body.find(b"\n")
+        try:
+            header = json.loads(body[:end]) if end != -1 else None
+            fetched_at = float(header["fetched_at"])
+        except (KeyError, TypeError, ValueError):
+            log.warning("Ignoring corrupt update document cache %s", self.path)
+            body.close()
+            return None
+        return CachedDocument(body, end + 1, header.get("etag"), header.get("last_modified"), fetched_at)
+
+    def load_fresh(self) -> CachedDocument | None:
+        """Return the cached document if it is younger than ``max_age``."""
+        cached = self.load()
+        if cached is not None and not 0 <= cached.age() < self.max_age:
+            cached.close()
+            return None
+        return cached
+
+    @contextlib.contextmanager
+    def writer(
+        self, etag: str | None, last_modified: str | None, fetched_at: float | None = None
+    ) -> Iterator[BinaryIO]:
+        """
+        Write a new document to the returned file, which replaces the cached
+        one at the end of the block, provided no exception was raised.
+        """
+        header = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time() if fetched_at is None else fetched_at,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", prefix=".astro-update-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(header).encode() + b"\n")
+                yield f
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+
+    def store(
+        self, chunks: Iterable[bytes], etag: str | None, last_modified: str | None, fetched_at: float | None = None
+    ) -> None:
+        with self.writer(etag, last_modified, fetched_at) as f:
+            for chunk in chunks:
+                f.write(chunk)
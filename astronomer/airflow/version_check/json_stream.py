@@ -0,0 +1,156 @@
+"""
+Incremental parsing of the update document.
+
+The update document is a JSON object of which we only need one member (the
+``runtimeVersionsV3`` object). Rather than loading the whole body and then
+decoding it, the functions here consume it chunk by chunk, skip the members we
+don't care about and yield the entries of the one we do as they are completed,
+so only the current entry has to be held in memory.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_decoder = json.JSONDecoder()
+
+
+class _ChunkReader:
+    """A cursor over JSON text that arrives in chunks of bytes or str."""
+
+    def __init__(self, chunks: Iterable[bytes | str]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._exhausted = False
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer, returning False once the input is exhausted."""
+        if self._exhausted:
+            return False
+        # Drop everything we have already consumed
+        self.buf = self.buf[self.pos :]
+        self.pos = 0
+        for chunk in self._chunks:
+            text = chunk if isinstance(chunk, str) else self._utf8.decode(chunk)
+            if text:
+                self.buf += text
+                return True
+        self._exhausted = True
+        text = self._utf8.decode(b"", final=True)
+        self.buf += text
+        return bool(text)
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or "" at the end of the input."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found or 'end of document'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def skip(self) -> None:
+        """Skip over the next JSON value without decoding it."""
+        if self.peek() not in "{[":
+            self.value()
+            return
+
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(self.buf, self.pos)
+            if match is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Unexpected end of document")
+                continue
+            if match.group() == '"':
+                string = _STRING.match(self.buf, match.start())
+                if string is None:
+                    # The string continues in the next chunk
+                    self.pos = match.start()
+                    if not self._fill():
+                        raise ValueError("Unterminated string")
+                    continue
+                self.pos = string.end()
+                continue
+            self.pos = match.end()
+            depth += 1 if match.group() in "{[" else -1
+            if depth == 0:
+                return
+
+    def members(self) -> Iterator[tuple[str, Any]]:
+        """Yield the members of the JSON object at the cursor, decoding each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            name = self.key()
+            yield name, self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+    def key(self) -> str:
+        name = self.value()
+        if not isinstance(name, str):
+            raise ValueError(f"Expected an object key but found {name!r}")
+        self.expect(":")
+        return name
+
+
+def iter_object_items(chunks: Iterable[bytes | str], key: str) -> Iterator[tuple[str, Any]]:
+    """
+    Yield the ``(name, value)`` pairs of the object stored under ``key`` in the
+    top level JSON object delivered by ``chunks``.
+
+    Nothing is yielded if ``key`` is not present. Reading stops as soon as the
+    object has been consumed. Raises ``ValueError`` on malformed input.
+    """
+    reader = _ChunkReader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.key()
+        if name == key:
+            yield from reader.members()
+            return
+        reader.skip()
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
@@ -0,0 +1,45 @@
+"""
+Local source of the update document, for clusters that can't reach ``update_url``.
+
+The source is either a file holding the update document, or a directory of
+snapshots of it, of which the last ``*.json`` file in name order is used (so
+name them by date, or by a zero-padded sequence number). The document's
+SHA-256 takes the place of an ETag, so a check can tell when it has changed
+however the file was copied into place.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+
+from astronomer.airflow.version_check.backoff import FailureKind, UpdateCheckError
+from astronomer.airflow.version_check.document_cache import CachedDocument
+
+
+def resolve_source(path: str) -> str:
+    """Return the file to read the update document from."""
+    if not os.path.isdir(path):
+        return path
+
+    snapshots = sorted(name for name in os.listdir(path) if name.endswith(".json") and not name.startswith("."))
+    if not snapshots:
+        raise UpdateCheckError(FailureKind.UNKNOWN, f"No update document snapshots found in {path}")
+    return os.path.join(path, snapshots[-1])
+
+
+def load_local_document(path: str) -> CachedDocument:
+    """Map the update document at ``path`` (a file or a directory of snapshots) into memory."""
+    source = resolve_source(path)
+    try:
+        with open(source, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == 0:
+                raise UpdateCheckError(FailureKind.MALFORMED, f"Update document {source} is empty")
+            body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError as e:
+        raise UpdateCheckError(FailureKind.UNKNOWN, f"Unable to read update document {source}: {e}") from e
+
+    etag = f'"sha256:{hashlib.sha256(body).hexdigest()}"'
+    return CachedDocument(body, 0, etag=etag, last_modified=None, fetched_at=stat.st_mtime)
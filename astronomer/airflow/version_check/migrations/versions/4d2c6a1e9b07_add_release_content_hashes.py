@@ -0,0 +1,34 @@
+"""Add release content hashes
+
+Revision ID: 4d2c6a1e9b07
+Revises: 8f50840b4fd2
+Create Date: 2026-10-16 21:30:52.000000
+
+Stores a hash of each release row, and of the whole set of releases written
+by the last check, so checks that find nothing new can skip writing releases.
+"""
+
+# revision identifiers, used by Alembic.
+revision = "4d2c6a1e9b07"
+down_revision = "8f50840b4fd2"
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa  # noqa: E402
+from alembic import op  # noqa: E402
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("releases_hash", sa.String(length=64), nullable=True))
+
+    with op.batch_alter_table("astro_available_version_v3", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("content_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("astro_available_version_v3", schema=None) as batch_op:
+        batch_op.drop_column("content_hash")
+
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.drop_column("releases_hash")
@@ -0,0 +1,29 @@
+"""Add results_checked_at to the version check table
+
+Revision ID: 5a9e3f7c2d18
+Revises: e2b7c1d94f3a
+Create Date: 2026-10-16 23:41:09.000000
+
+Records which check last committed its results, so the status API can tell a
+check in progress from a finished one.
+"""
+
+# revision identifiers, used by Alembic.
+revision = "5a9e3f7c2d18"
+down_revision = "e2b7c1d94f3a"
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa  # noqa: E402
+from airflow.utils.sqlalchemy import UtcDateTime  # noqa: E402
+from alembic import op  # noqa: E402
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("results_checked_at", UtcDateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.drop_column("results_checked_at")
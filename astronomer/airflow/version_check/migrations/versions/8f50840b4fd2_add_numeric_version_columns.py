@@ -0,0 +1,63 @@
+"""Add numeric version columns to the available version table
+
+Revision ID: 8f50840b4fd2
+Revises: c8f933ed0213
+Create Date: 2026-10-16 10:03:17.000000
+
+Adds major, minor and patch columns (and an index over them) so the latest
+applicable release can be found with an ordered query instead of sorting
+every row in Python. Existing rows are backfilled from their version string.
+"""
+
+# revision identifiers, used by Alembic.
+revision = "8f50840b4fd2"
+down_revision = "c8f933ed0213"
+branch_labels = None
+depends_on = None
+
+import re  # noqa: E402
+
+import sqlalchemy as sa  # noqa: E402
+from alembic import context, op  # noqa: E402
+
+VERSION_RE = re.compile(r"(\d+)\.(\d+)(?:-(\d+))?")
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("astro_available_version_v3", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("major", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("minor", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("patch", sa.Integer(), nullable=True))
+        batch_op.create_index("idx_astro_available_version_v3_sort", ["major", "minor", "patch"], unique=False)
+
+    # The version strings have to be parsed in Python, which we can't do when
+    # only generating SQL
+    if context.is_offline_mode():
+        return
+
+    table = sa.table(
+        "astro_available_version_v3",
+        sa.column("version", sa.Text()),
+        sa.column("major", sa.Integer()),
+        sa.column("minor", sa.Integer()),
+        sa.column("patch", sa.Integer()),
+    )
+    conn = op.get_bind()
+    for (version,) in conn.execute(sa.select(table.c.version)).fetchall():
+        match = VERSION_RE.match(version)
+        if not match:
+            continue
+        major, minor, patch = match.groups()
+        conn.execute(
+            table.update()
+            .where(table.c.version == version)
+            .values(major=int(major), minor=int(minor), patch=int(patch or 0))
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("astro_available_version_v3", schema=None) as batch_op:
+        batch_op.drop_index("idx_astro_available_version_v3_sort")
+        batch_op.drop_column("patch")
+        batch_op.drop_column("minor")
+        batch_op.drop_column("major")
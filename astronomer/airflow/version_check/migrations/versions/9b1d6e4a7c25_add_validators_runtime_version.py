@@ -0,0 +1,28 @@
+"""Add validators_runtime_version to the version check table
+
+Revision ID: 9b1d6e4a7c25
+Revises: 5a9e3f7c2d18
+Create Date: 2026-10-17 10:14:32.000000
+
+Records which runtime version processed the update document whose validators
+are stored, so a different version doesn't skip processing it with a 304.
+"""
+
+# revision identifiers, used by Alembic.
+revision = "9b1d6e4a7c25"
+down_revision = "5a9e3f7c2d18"
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa  # noqa: E402
+from alembic import op  # noqa: E402
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("validators_runtime_version", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.drop_column("validators_runtime_version")
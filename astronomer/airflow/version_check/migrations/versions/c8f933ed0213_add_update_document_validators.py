@@ -0,0 +1,30 @@
+"""Add update document validators to the version check table
+
+Revision ID: c8f933ed0213
+Revises: c7f8e9a2b3d4
+Create Date: 2026-10-16 09:12:41.000000
+
+Stores the ETag and Last-Modified headers of the last processed update
+document so the next check can make a conditional request.
+"""
+
+# revision identifiers, used by Alembic.
+revision = "c8f933ed0213"
+down_revision = "c7f8e9a2b3d4"
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa  # noqa: E402
+from alembic import op  # noqa: E402
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("etag", sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column("last_modified", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.drop_column("last_modified")
+        batch_op.drop_column("etag")
@@ -0,0 +1,29 @@
+"""Add check_requested_at to the version check table
+
+Revision ID: e2b7c1d94f3a
+Revises: 4d2c6a1e9b07
+Create Date: 2026-10-16 23:05:17.000000
+
+Lets any process ask the update check thread, which runs in the scheduler,
+to check straight away.
+"""
+
+# revision identifiers, used by Alembic.
+revision = "e2b7c1d94f3a"
+down_revision = "4d2c6a1e9b07"
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa  # noqa: E402
+from airflow.utils.sqlalchemy import UtcDateTime  # noqa: E402
+from alembic import op  # noqa: E402
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("check_requested_at", UtcDateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("astro_version_check_v3", schema=None) as batch_op:
+        batch_op.drop_column("check_requested_at")
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import contextlib
+import hashlib
+import json
 import logging
 import os
 import threading
-from typing import TYPE_CHECKING
+from datetime import datetime
+from typing import TYPE_CHECKING, Collection, Iterable, Iterator, Mapping, NamedTuple
 
 import sqlalchemy.ext
 from airflow.models.base import _get_schema, naming_convention
@@ -11,8 +15,10 @@ from airflow.utils.net import get_hostname
 from airflow.utils.session import create_session
 from airflow.utils.sqlalchemy import UtcDateTime
 from airflow.utils.timezone import utcnow
-from sqlalchemy import Boolean, Column, Index, MetaData, String, Text, or_
-from sqlalchemy.orm import declarative_base
+from sqlalchemy import Boolean, Column, Index, Integer, MetaData, String, Text, and_, or_
+from sqlalchemy.orm import declarative_base, validates
+
+from astronomer.airflow.version_check.models.lock import CheckLockContended, get_check_lock
 
 if TYPE_CHECKING:
     from datetime import timedelta
@@ -26,6 +32,17 @@ metadata = MetaData(schema=_get_schema(), naming_convention=naming_convention)
 Base = declarative_base(metadata=metadata)
 
 
+class CheckClaim(NamedTuple):
+    """A claim on the next update check, as made by ``AstronomerVersionCheck.claim_check``."""
+
+    checked_at: datetime
+    checked_by: str
+    previously_checked_at: datetime | None
+    etag: str | None
+    last_modified: str | None
+    validators_runtime_version: str | None
+
+
 class AstronomerVersionCheck(Base):
     __tablename__ = "astro_version_check_v3"
     singleton = Column(Boolean, default=True, nullable=False, primary_key=True)
@@ -34,6 +51,27 @@ class AstronomerVersionCheck(Base):
     last_checked = Column(UtcDateTime(timezone=True))
     last_checked_by = Column(Text)
 
+    # Validators of the last processed update document, sent back on the next
+    # request so an unchanged document is answered with a 304
+    etag = Column(Text)
+    last_modified = Column(Text)
+    # The runtime version that processed that document. Only releases at or
+    # above it were written, so the validators are no use to any other version.
+    validators_runtime_version = Column(Text)
+
+    # Hash of the releases written by the last check (see
+    # ``AstronomerAvailableVersion.hash_releases``), so a check that finds the
+    # same releases again needn't write any of them
+    releases_hash = Column(String(64))
+
+    # The last_checked of the check whose results were last committed. While
+    # it differs from last_checked, a check has been claimed but not finished.
+    results_checked_at = Column(UtcDateTime(timezone=True))
+
+    # Set by ``request_check`` to ask whichever process runs the update check
+    # thread to check straight away, and cleared by the next claim
+    check_requested_at = Column(UtcDateTime(timezone=True))
+
     @classmethod
     def ensure_singleton(cls):
         """
@@ -52,31 +90,128 @@ class AstronomerVersionCheck(Base):
                 session.rollback()
 
     @classmethod
-    def acquire_lock(cls, check_interval: timedelta, session: Session) -> AstronomerVersionCheck | None:
+    @contextlib.contextmanager
+    def check_lock(cls) -> Iterator[None]:
         """
-        Acquire an exclusive lock to perform an update check if the check is due
-        and if another check is not already in progress.
+        Hold the exclusive update check lock for the duration of the block.
 
-        We use the database to hold the lock for as long as this transaction is open using `FOR UPDATE SKIP LOCKED`.
+        The kind of lock depends on the database (see ``models.lock``), but all
+        of them raise ``CheckLockContended`` straight away if another process
+        holds the lock. Open the session that does the check inside this block,
+        so its transaction is committed before the lock is released.
+        """
+        from airflow import settings
 
-        This method will either return a row meaning the check is due and we
-        have acquired the lock. The lock will be held for the duration of the
-        database transaction -- be careful to to close this before you are
-        done!
+        lock = get_check_lock(settings.engine, metadata.schema)
+        if not lock.acquire():
+            raise CheckLockContended("Another process is performing an update check")
+        try:
+            yield
+        finally:
+            lock.release()
 
-        This will throw an error if the lock is held by another transaction.
+    @classmethod
+    def claim_check(
+        cls, check_interval: timedelta, session: Session, lease: timedelta | None = None
+    ) -> CheckClaim | None:
+        """
+        Claim the next update check, if it is due, by moving ``last_checked``
+        forward with a single compare-and-set UPDATE.
+
+        Only one process can win the claim, and no lock is held once the
+        session commits, so the update document can be fetched without keeping
+        a transaction open. Check that the claim still holds with
+        ``holds_claim`` before writing the results.
+
+        :param lease: How long a claim that hasn't been completed or released
+            is left alone before it is taken to be abandoned (by a process that
+            was killed mid-check, say) and can be claimed again
         """
         now = utcnow()
+        row = cls.get(session)
+        previously_checked_at = row.last_checked
 
-        return (
+        due = [cls.last_checked.is_(None), cls.last_checked <= now - check_interval]
+        if lease is not None:
+            due.append(and_(cls.in_progress(), cls.last_checked <= now - lease))
+        claimed = (
             session.query(cls)
-            .filter(
-                cls.singleton.is_(True),
-                or_(cls.last_checked.is_(None), cls.last_checked <= now - check_interval),
+            .filter(cls.singleton.is_(True), or_(*due))
+            .update(
+                {cls.last_checked: now, cls.last_checked_by: cls.host_identifier(), cls.check_requested_at: None},
+                synchronize_session=False,
             )
-            .with_for_update(nowait=True)
-            .one_or_none()
         )
+        if not claimed:
+            return None
+
+        # Read back what was stored, so the claim compares equal to the row
+        session.refresh(row)
+        return CheckClaim(
+            checked_at=row.last_checked,
+            checked_by=row.last_checked_by,
+            previously_checked_at=previously_checked_at,
+            etag=row.etag,
+            last_modified=row.last_modified,
+            validators_runtime_version=row.validators_runtime_version,
+        )
+
+    @classmethod
+    def in_progress(cls):
+        """Return a SQL expression that is true while a claimed check hasn't been completed or released."""
+        return or_(cls.results_checked_at.is_(None), cls.results_checked_at != cls.last_checked)
+
+    @classmethod
+    def request_check(cls, session: Session) -> None:
+        """
+        Ask for an update check to be performed straight away, by whichever
+        process is running the update check thread.
+
+        The thread polls for requests every ``update_check_trigger_poll_interval``
+        seconds, so this works from any process that can reach the database.
+        """
+        session.query(cls).filter(cls.singleton.is_(True)).update(
+            {cls.check_requested_at: utcnow()}, synchronize_session=False
+        )
+
+    @classmethod
+    def check_requested(cls, session: Session) -> bool:
+        """Return whether an update check has been requested with ``request_check`` and not yet claimed."""
+        return (
+            session.query(cls.check_requested_at)
+            .filter(cls.singleton.is_(True), cls.check_requested_at.isnot(None))
+            .first()
+            is not None
+        )
+
+    @classmethod
+    def _claimed(cls, claim: CheckClaim, session: Session):
+        return session.query(cls).filter(
+            cls.singleton.is_(True),
+            cls.last_checked == claim.checked_at,
+            cls.last_checked_by == claim.checked_by,
+        )
+
+    @classmethod
+    def holds_claim(cls, claim: CheckClaim, session: Session) -> AstronomerVersionCheck | None:
+        """
+        Return the update tracking row if ``claim`` has not been taken over by
+        another process (after a forced check, say) since it was made.
+        """
+        return cls._claimed(claim, session).one_or_none()
+
+    @classmethod
+    def complete_claim(cls, claim: CheckClaim, session: Session) -> None:
+        """Record that the check of ``claim`` finished without anything to write."""
+        cls._claimed(claim, session).update({cls.results_checked_at: claim.checked_at}, synchronize_session=False)
+
+    @classmethod
+    def release_claim(cls, claim: CheckClaim, session: Session) -> None:
+        """
+        Give up a claim after a failed check, so the next attempt isn't
+        pushed back a whole check interval.
+        """
+        cls._claimed(claim, session).update({cls.last_checked: claim.previously_checked_at}, synchronize_session=False)
 
     @classmethod
     def get(cls, session):
@@ -112,4 +247,161 @@ class AstronomerAvailableVersion(Base):
     eos_dismissed_until = Column(UtcDateTime(timezone=True), nullable=True)
     yanked = Column(Boolean, default=False, nullable=True)
 
-    __table_args__ = (Index("idx_astro_available_version_v3_hidden", hidden_from_ui),)
+    # Numeric components of `version`, so releases can be ordered in SQL
+    major = Column(Integer, nullable=True)
+    minor = Column(Integer, nullable=True)
+    patch = Column(Integer, nullable=True)
+
+    # Hash of the UPSERT_COLUMNS, so unchanged releases aren't written again
+    content_hash = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        Index("idx_astro_available_version_v3_hidden", hidden_from_ui),
+        Index("idx_astro_available_version_v3_sort", major, minor, patch),
+    )
+
+    # Columns taken from the update document on every check. eos_dismissed_until
+    # is set by users and has to survive an update of the row.
+    UPSERT_COLUMNS = (
+        "level",
+        "date_released",
+        "description",
+        "url",
+        "hidden_from_ui",
+        "end_of_maintenance",
+        "end_of_basic_support",
+        "yanked",
+        "major",
+        "minor",
+        "patch",
+        "content_hash",
+    )
+    UPSERT_BATCH_SIZE = 500
+
+    @validates("version")
+    def _set_version_key(self, _, value):
+        from astronomer.airflow.version_check.update_checks import parse_version_key
+
+        self.major, self.minor, self.patch = parse_version_key(value) or (None, None, None)
+        return value
+
+    @classmethod
+    def newer_than(cls, version_key: tuple[int, int, int]):
+        """
+        Return a SQL expression that is true for releases newer than ``version_key``.
+
+        Rows whose version could not be parsed compare as NULL, so they match
+        neither this expression nor its negation.
+        """
+        major, minor, patch = version_key
+        return or_(
+            cls.major > major,
+            and_(cls.major == major, cls.minor > minor),
+            and_(cls.major == major, cls.minor == minor, cls.patch > patch),
+        )
+
+    def compute_content_hash(self) -> str:
+        """Return a hash of the version and everything the update document says about it."""
+        values = [self.version]
+        for col in self.UPSERT_COLUMNS:
+            if col == "content_hash":
+                continue
+            value = getattr(self, col)
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        return hashlib.sha256(json.dumps(values, separators=(",", ":")).encode()).hexdigest()
+
+    @classmethod
+    def hash_releases(cls, releases: Iterable[AstronomerAvailableVersion]) -> str:
+        """
+        Set the ``content_hash`` of each of ``releases``, and return a hash of
+        them all that doesn't depend on their order.
+        """
+        hashes = []
+        for rel in releases:
+            rel.content_hash = rel.compute_content_hash()
+            hashes.append(f"{rel.version}:{rel.content_hash}")
+        return hashlib.sha256("\n".join(sorted(hashes)).encode()).hexdigest()
+
+    @classmethod
+    def stored_hashes(cls, versions: Iterable[str], session: Session) -> dict[str, str | None]:
+        """Return the ``content_hash`` of each of ``versions`` that is stored, by version."""
+        versions = list(versions)
+        stored = {}
+        for start in range(0, len(versions), cls.UPSERT_BATCH_SIZE):
+            batch = versions[start : start + cls.UPSERT_BATCH_SIZE]
+            stored.update(session.query(cls.version, cls.content_hash).filter(cls.version.in_(batch)))
+        return stored
+
+    @classmethod
+    def changed_releases(
+        cls,
+        releases: Iterable[AstronomerAvailableVersion],
+        session: Session,
+        stored: Mapping[str, str | None] | None = None,
+    ) -> list[AstronomerAvailableVersion]:
+        """
+        Return those of ``releases`` (hashed by ``hash_releases``) that aren't stored as they are already.
+
+        :param stored: The result of ``stored_hashes`` for ``releases``, if the caller already has it
+        """
+        releases = list(releases)
+        if stored is None:
+            stored = cls.stored_hashes([rel.version for rel in releases], session=session)
+        return [rel for rel in releases if stored.get(rel.version, "") != rel.content_hash]
+
+    @classmethod
+    def upsert(
+        cls,
+        releases: Iterable[AstronomerAvailableVersion],
+        session: Session,
+        existing: Collection[str] | None = None,
+    ) -> list[str]:
+        """
+        Insert or update ``releases`` in bulk.
+
+        Each batch is written with a single ``INSERT ... ON CONFLICT DO UPDATE``
+        (PostgreSQL and SQLite) or ``INSERT ... ON DUPLICATE KEY UPDATE`` (MySQL)
+        statement. Other dialects fall back to merging row by row.
+
+        :param existing: The versions of ``releases`` that are already stored,
+            if the caller knows, so they needn't be looked up
+        :return: The versions that did not exist before this call
+        """
+        releases = list(releases)
+        dialect = session.get_bind().dialect.name
+        inserted = []
+
+        for start in range(0, len(releases), cls.UPSERT_BATCH_SIZE):
+            batch = releases[start : start + cls.UPSERT_BATCH_SIZE]
+            versions = [rel.version for rel in batch]
+            if existing is None:
+                stored = {v for (v,) in session.query(cls.version).filter(cls.version.in_(versions))}
+            else:
+                stored = existing
+            inserted.extend(v for v in versions if v not in stored)
+
+            if dialect not in ("postgresql", "sqlite", "mysql"):
+                for rel in batch:
+                    session.merge(rel)
+                continue
+
+            rows = [{col: getattr(rel, col) for col in ("version", *cls.UPSERT_COLUMNS)} for rel in batch]
+            if dialect == "mysql":
+                from sqlalchemy.dialects.mysql import insert
+
+                stmt = insert(cls.__table__).values(rows)
+                stmt = stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in cls.UPSERT_COLUMNS})
+            else:
+                if dialect == "postgresql":
+                    from sqlalchemy.dialects.postgresql import insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert
+
+                stmt = insert(cls.__table__).values(rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[cls.__table__.c.version],
+                    set_={col: stmt.excluded[col] for col in cls.UPSERT_COLUMNS},
+                )
+            session.execute(stmt)
+
+        return inserted
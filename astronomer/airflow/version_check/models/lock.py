@@ -0,0 +1,170 @@
+"""
+Locks that stop more than one process performing an update check at a time.
+
+Each database gets the cheapest lock it supports, all of which fail fast
+rather than wait if another process already holds the lock. The locks are
+taken on their own connection (or file) rather than the caller's session, so
+they can be released after the session's transaction has been committed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import zlib
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection, Engine
+
+log = logging.getLogger(__name__)
+
+LOCK_PREFIX = "astronomer_version_check"
+
+
+def lock_name(engine: Engine, schema: str | None = None) -> str:
+    """
+    Return the name of the lock for the tables in ``schema`` of ``engine``'s database.
+
+    MySQL's named locks are global to the server, so deployments that share a
+    server (or a database, with different schemas) each need a lock of their
+    own. The target is hashed to keep within MySQL's 64 character limit.
+    """
+    target = f"{engine.url.database or ''}/{schema or ''}"
+    return f"{LOCK_PREFIX}_{hashlib.sha256(target.encode()).hexdigest()[:16]}"
+
+
+def lock_id(name: str) -> int:
+    """Return the key of the lock called ``name``, as pg advisory locks are keyed on a number."""
+    return zlib.crc32(name.encode())
+
+
+class CheckLockContended(Exception):
+    """Raised when another process holds the update check lock."""
+
+
+class CheckLock:
+    """Base class of the update check locks."""
+
+    def __init__(self, engine: Engine, schema: str | None = None):
+        self.engine = engine
+        self.name = lock_name(engine, schema)
+
+    def acquire(self) -> bool:
+        """Try to take the lock without waiting, returning False if someone else holds it."""
+        raise NotImplementedError
+
+    def release(self) -> None:
+        raise NotImplementedError
+
+
+class _ConnectionLock(CheckLock):
+    """A lock that lives on a dedicated database connection."""
+
+    connection: Connection | None = None
+
+    def acquire(self) -> bool:
+        self.connection = self.engine.connect()
+        try:
+            acquired = self._acquire(self.connection)
+        except Exception:
+            self.connection.close()
+            raise
+        if not acquired:
+            self.connection.close()
+        return acquired
+
+    def release(self) -> None:
+        try:
+            self._release(self.connection)
+        except Exception:
+            log.warning("Unable to release the update check lock, discarding its connection", exc_info=True)
+            # Closing the DB connection releases whatever it holds
+            self.connection.invalidate()
+        finally:
+            self.connection.close()
+
+    def _acquire(self, connection: Connection) -> bool:
+        raise NotImplementedError
+
+    def _release(self, connection: Connection) -> None:
+        raise NotImplementedError
+
+
+class PostgresAdvisoryLock(_ConnectionLock):
+    """A transaction level advisory lock, released by ending the transaction."""
+
+    def _acquire(self, connection):
+        connection.begin()
+        acquired = connection.execute(
+            text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": lock_id(self.name)}
+        ).scalar()
+        if not acquired:
+            connection.rollback()
+        return bool(acquired)
+
+    def _release(self, connection):
+        connection.rollback()
+
+
+class MySQLNamedLock(_ConnectionLock):
+    """A ``GET_LOCK`` named lock, which belongs to the connection until released."""
+
+    def _acquire(self, connection):
+        return connection.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": self.name}).scalar() == 1
+
+    def _release(self, connection):
+        connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": self.name})
+
+
+class SQLiteFileLock(CheckLock):
+    """
+    SQLite has neither row nor advisory locks, but its database is a local
+    file, so an exclusive ``flock`` on a file next to it does the same job.
+    """
+
+    _file = None
+
+    def acquire(self) -> bool:
+        import fcntl
+
+        database = self.engine.url.database
+        if not database or database == ":memory:":
+            # Nothing else can see this database
+            return True
+
+        self._file = open(f"{database}.astro-version-check.lock", "a")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+        return True
+
+    def release(self) -> None:
+        import fcntl
+
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+LOCK_BACKENDS: dict[str, type[CheckLock]] = {
+    "postgresql": PostgresAdvisoryLock,
+    "mysql": MySQLNamedLock,
+    "sqlite": SQLiteFileLock,
+}
+
+
+def get_check_lock(engine: Engine, schema: str | None = None) -> CheckLock:
+    """Return the update check lock to use for the tables in ``schema`` of ``engine``'s database."""
+    try:
+        lock_class = LOCK_BACKENDS[engine.dialect.name]
+    except KeyError:
+        # Airflow doesn't support any other database
+        raise ValueError(f"No update check lock for {engine.dialect.name} databases") from None
+    return lock_class(engine, schema)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import functools
+import logging
 from pathlib import Path
 
 import sqlalchemy as sa
@@ -10,12 +12,36 @@ from airflow.utils.db_manager import BaseDBManager
 
 from astronomer.airflow.version_check.models.db import Base
 
+log = logging.getLogger(__name__)
+
 PACKAGE_DIR = Path(__file__).parents[1]
 
 _REVISION_HEADS_MAP: dict[str, str] = {
     "3.1.0": "b5ad49d1f9b4",
 }
 
+# Names the tables, in :schema (or the connection's default schema), and the
+# alembic version table, in the default schema, that exist, in one round trip
+_CATALOG_QUERIES = {
+    "postgresql": """
+        SELECT c.relname FROM pg_catalog.pg_class c
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p') AND (
+            (n.nspname = COALESCE(CAST(:schema AS TEXT), current_schema()) AND c.relname IN :tables)
+            OR (n.nspname = current_schema() AND c.relname = :version_table)
+        )
+    """,
+    "mysql": """
+        SELECT table_name FROM information_schema.tables
+        WHERE (table_schema = COALESCE(:schema, DATABASE()) AND table_name IN :tables)
+        OR (table_schema = DATABASE() AND table_name = :version_table)
+    """,
+    "sqlite": """
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND (name IN :tables OR name = :version_table)
+    """,
+}
+
 
 class VersionCheckDBManager(BaseDBManager):
     """Manages Version Check database."""
@@ -26,7 +52,63 @@ class VersionCheckDBManager(BaseDBManager):
     alembic_file = (PACKAGE_DIR / "alembic.ini").as_posix()
     supports_table_dropping = True
 
+    # Set once the schema has been found to be up to date, so it isn't checked again
+    _schema_current = False
+
+    @classmethod
+    def schema_is_current(cls) -> bool:
+        """
+        Return whether this plugin's tables exist and have been migrated to the latest revision.
+
+        The tables are looked up with a single catalog query rather than by
+        reflection, which is slow on large catalogs. A positive result is
+        remembered for the life of the process (or until this manager changes
+        the schema), a negative one isn't, as migrations usually run elsewhere.
+        """
+        if cls._schema_current:
+            return True
+
+        tables = [table.name for table in cls.metadata.sorted_tables]
+        with settings.engine.connect() as connection:
+            found = cls._existing_tables(connection, tables)
+            if not found.issuperset(tables):
+                log.info("Tables %s are missing", sorted(set(tables) - found))
+                return False
+            if cls.version_table_name not in found:
+                log.info("Migration version table %s is missing", cls.version_table_name)
+                return False
+            revision = connection.execute(sa.text(f"SELECT version_num FROM {cls.version_table_name}")).scalar()
+
+        if revision not in _script_heads():
+            log.info("Database is at revision %s, not the latest (%s)", revision, ", ".join(_script_heads()))
+            return False
+
+        cls._schema_current = True
+        return True
+
+    @classmethod
+    def _existing_tables(cls, connection, tables: list[str]) -> set[str]:
+        query = _CATALOG_QUERIES.get(connection.dialect.name)
+        if query is None:
+            inspector = sa.inspect(connection)
+            found = {name for name in tables if inspector.has_table(name, schema=cls.metadata.schema)}
+            if inspector.has_table(cls.version_table_name):
+                found.add(cls.version_table_name)
+            return found
+
+        statement = sa.text(query).bindparams(sa.bindparam("tables", expanding=True))
+        if connection.dialect.name == "sqlite":
+            params = {"tables": tables, "version_table": cls.version_table_name}
+        else:
+            params = {"tables": tables, "version_table": cls.version_table_name, "schema": cls.metadata.schema}
+        return {name for (name,) in connection.execute(statement, params)}
+
+    @classmethod
+    def invalidate_schema_cache(cls) -> None:
+        cls._schema_current = False
+
     def create_db_from_orm(self):
+        self.invalidate_schema_cache()
         super().create_db_from_orm()
         # Drop old Airflow 2 tables if they exist
         # This is needed because migrations aren't run when the db is initially
@@ -42,6 +124,7 @@ class VersionCheckDBManager(BaseDBManager):
 
     def upgradedb(self, to_revision=None, from_revision=None, show_sql_only=False):
         """Upgrade the database."""
+        self.invalidate_schema_cache()
         if from_revision and not show_sql_only:
             raise AirflowException("`from_revision` only supported with `sql_only=True`.")
 
@@ -71,6 +154,7 @@ class VersionCheckDBManager(BaseDBManager):
         command.upgrade(config, revision=to_revision or "heads")
 
     def downgrade(self, to_revision, from_revision=None, show_sql_only=False):
+        self.invalidate_schema_cache()
         if from_revision and not show_sql_only:
             raise ValueError(
                 "`from_revision` can't be combined with `show_sql_only=False`. When actually "
@@ -101,4 +185,11 @@ class VersionCheckDBManager(BaseDBManager):
             command.downgrade(config, revision=to_revision, sql=show_sql_only)
 
     def drop_tables(self, connection):
+        self.invalidate_schema_cache()
         super().drop_tables(connection)
+
+
+@functools.lru_cache(maxsize=None)
+def _script_heads() -> tuple[str, ...]:
+    """The head revisions of our migrations."""
+    return tuple(VersionCheckDBManager(session=None).get_script_object().get_heads())
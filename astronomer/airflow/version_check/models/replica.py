@@ -0,0 +1,87 @@
+"""
+Sessions for the reads behind the plugin's notices.
+
+The notices are read on every page the plugin shows them on. If
+``[astronomer] read_sql_alchemy_conn`` names a read replica of the metadata
+database those reads go there, leaving the primary to the update checks and
+dismissals, which always write through Airflow's own session. Without it the
+reads use Airflow's session too.
+
+A replica lags the primary, so a notice can stay stale for that long (plus
+``notice_cache_ttl``) after an update check or a dismissal.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import threading
+from typing import TYPE_CHECKING, Iterator
+
+from airflow.configuration import conf
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+    from sqlalchemy.orm import Session, sessionmaker
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_engine: Engine | None = None
+_session_factory: sessionmaker | None = None
+
+
+def get_read_engine() -> Engine | None:
+    """Return the engine of the read replica, creating it on first use, or None if there isn't one."""
+    global _engine, _session_factory
+
+    read_conn = conf.get("astronomer", "read_sql_alchemy_conn", fallback=None)
+    if not read_conn:
+        return None
+
+    with _lock:
+        if _engine is None:
+            from sqlalchemy import create_engine
+            from sqlalchemy.orm import sessionmaker
+
+            _engine = create_engine(
+                read_conn,
+                # Replicas get restarted and failed over independently of the primary
+                pool_pre_ping=True,
+                pool_recycle=conf.getint("database", "sql_alchemy_pool_recycle", fallback=1800),
+            )
+            # Notices are built from the rows after the session has closed
+            _session_factory = sessionmaker(bind=_engine, autoflush=False, expire_on_commit=False)
+            log.info("Reading notices from %s", _engine.url.render_as_string(hide_password=True))
+        return _engine
+
+
+@contextlib.contextmanager
+def create_read_session() -> Iterator[Session]:
+    """
+    Return a session for reading the update tables, from the read replica if one is configured.
+
+    Nothing written through this session is committed.
+    """
+    if get_read_engine() is None:
+        from airflow.utils.session import create_session
+
+        with create_session() as session:
+            yield session
+        return
+
+    session = _session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def dispose_read_engine() -> None:
+    """Close the read replica's connections, so the next read connects (and reads the config) again."""
+    global _engine, _session_factory
+
+    with _lock:
+        if _engine is not None:
+            _engine.dispose()
+        _engine = _session_factory = None
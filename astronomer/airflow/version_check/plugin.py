@@ -1,10 +1,13 @@
+import atexit
 import functools
+import importlib
+import importlib.abc
+import importlib.util
 import logging
+import sys
 
 from airflow.configuration import conf
 from airflow.plugins_manager import AirflowPlugin
-from airflow.utils.session import create_session
-from sqlalchemy import inspect
 
 __version__ = "3.0.0"
 
@@ -15,10 +18,82 @@ eol_warning_opt_out = conf.getboolean("astronomer", "eol_warning_opt_out", fallb
 dismissal_period_days = conf.getint("astronomer", "eol_dismissal_period_days", fallback=7)
 eol_warning_threshold_days = conf.getint("astronomer", "eol_warning_threshold_days", fallback=30)
 
+SCHEDULER_MODULE = "airflow.jobs.scheduler_job_runner"
+# Where Airflow's API server mounts the plugin's API, see api.py
+STATUS_URL_PREFIX = "/astronomer-version-check"
+
+
+class _PostImportHook(importlib.abc.MetaPathFinder):
+    """Call ``callback`` with the module called ``name`` once something else imports it."""
+
+    def __init__(self, name, callback):
+        self.name = name
+        self.callback = callback
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname != self.name:
+            return None
+        # Only needed once, and this stops find_spec below finding us again
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(fullname)
+        if spec is None or spec.loader is None:
+            return spec
+
+        exec_module = spec.loader.exec_module
+
+        def exec_and_call(module):
+            exec_module(module)
+            self.callback(module)
+
+        spec.loader.exec_module = exec_and_call
+        return spec
+
+
+def when_imported(name, callback) -> None:
+    """
+    Call ``callback`` with the module called ``name`` straight away if it has
+    already been imported, otherwise as soon as it is.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        callback(module)
+    else:
+        sys.meta_path.insert(0, _PostImportHook(name, callback))
+
+
+class _LazyASGIApp:
+    """
+    An ASGI app that creates the real one, by calling ``factory`` (a
+    "module:function" string), when it first gets a request. That way only
+    the API server imports FastAPI and the rest of the app, and only once it
+    is used.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._app = None
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            module, _, name = self.factory.partition(":")
+            self._app = getattr(importlib.import_module(module), name)()
+        await self._app(scope, receive, send)
+
 
 class AstronomerVersionCheckPlugin(AirflowPlugin):
     name = "astronomer_version_check"
 
+    fastapi_apps = [
+        {
+            "app": _LazyASGIApp("astronomer.airflow.version_check.api:create_app"),
+            "url_prefix": STATUS_URL_PREFIX,
+            "name": "Astronomer version check",
+        }
+    ]
+
+    # The CheckThread running in this process, if any
+    update_thread = None
+
     @staticmethod
     def add_before_call(mod_or_cls, target, pre_fn) -> None:
         """Add a function to be called before another function in a module or class."""
@@ -36,25 +111,27 @@ class AstronomerVersionCheckPlugin(AirflowPlugin):
         """
         Hook in to various places in Airflow in a slightly horrible
         way -- by using functools.wraps and replacing the function.
+
+        Every Airflow process loads plugins, so this mustn't touch the
+        database or import anything heavy: the scheduler module is only
+        hooked once something else imports it, and the tables are checked
+        when the scheduler starts the update thread.
         """
 
         if update_check_interval == 0:
             log.debug("Skipping running update_check_plugin as [astronomer] update_check_interval = 0")
             return
 
-        if not cls.all_table_created():
+        if "VersionCheckDBManager" not in conf.get("database", "external_db_managers", fallback=""):
             log.warning(
-                "AstronomerVersionCheck tables are missing please ensure to add VersionCheckDBManager "
-                "to AIRFLOW__DATABASE__EXTERNAL_DB_MANAGERS configuration. No update checks will be performed"
+                "VersionCheckDBManager is missing from the AIRFLOW__DATABASE__EXTERNAL_DB_MANAGERS "
+                "configuration, please add it. No update checks will be performed"
             )
             return
 
-        from airflow.jobs.scheduler_job_runner import SchedulerJobRunner
-
-        cls.add_before_call(
-            SchedulerJobRunner,
-            "_execute",
-            cls.start_update_thread,
+        when_imported(
+            SCHEDULER_MODULE,
+            lambda module: cls.add_before_call(module.SchedulerJobRunner, "_execute", cls.start_update_thread),
         )
 
     @classmethod
@@ -72,24 +149,44 @@ class AstronomerVersionCheckPlugin(AirflowPlugin):
             return
 
         AstronomerVersionCheck.ensure_singleton()
-        CheckThread().start()
+        cls.update_thread = CheckThread()
+        cls.update_thread.start()
+        atexit.register(cls.stop_update_thread)
 
     @classmethod
-    def all_table_created(cls):
-        """Check if there are missing tables"""
-        from astronomer.airflow.version_check.models.db import (
-            AstronomerAvailableVersion,
-            AstronomerVersionCheck,
-        )
+    def trigger_update_check(cls) -> bool:
+        """
+        Ask for an update check to be performed now.
+
+        This can be called from any process (a CLI command or the API server,
+        say): the request is recorded in the database, and the scheduler's
+        update thread picks it up within ``update_check_trigger_poll_interval``
+        seconds, if that is set, or otherwise with its next check. An update
+        thread running in this process is woken straight away.
+
+        Returns True if the update thread in this process was woken.
+        """
+        from airflow.utils.session import create_session
+
+        from astronomer.airflow.version_check.models.db import AstronomerVersionCheck
 
-        tables = [AstronomerAvailableVersion, AstronomerVersionCheck]
         with create_session() as session:
-            engine = session.get_bind(mapper=None, clause=None)
-            inspector = inspect(engine)
-            if not getattr(inspector, "has_table", None):
-                inspector = engine
-            for table in tables:
-                if not inspector.has_table(table.__tablename__):
-                    # return early
-                    return False
+            AstronomerVersionCheck.request_check(session)
+
+        if cls.update_thread is None or not cls.update_thread.is_alive():
+            return False
+        cls.update_thread.trigger_check()
         return True
+
+    @classmethod
+    def stop_update_thread(cls) -> None:
+        """Stop the update thread running in this process, if any."""
+        if cls.update_thread is not None:
+            cls.update_thread.stop()
+
+    @classmethod
+    def all_table_created(cls):
+        """Check if there are missing tables, or migrations that haven't been applied"""
+        from astronomer.airflow.version_check.models.manager import VersionCheckDBManager
+
+        return VersionCheckDBManager.schema_is_current()
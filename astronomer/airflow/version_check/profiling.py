@@ -0,0 +1,79 @@
+"""
+Opt-in profiling of update checks in a running process.
+
+``profiled`` runs a block under cProfile and tracemalloc, then writes the
+profile (loadable with ``pstats`` or snakeviz) and a text report of the
+slowest functions and the largest allocation sites to a directory, logging
+the names of the files it wrote.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Iterator
+
+log = logging.getLogger(__name__)
+
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+
+@contextlib.contextmanager
+def profiled(directory: str, label: str) -> Iterator[None]:
+    """Profile the block, writing ``<label>-<timestamp>-<pid>.prof`` and ``.txt`` files to ``directory``."""
+    # Don't get in the way of anyone else that is tracing allocations
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    else:
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        try:
+            paths = _write_report(directory, label, profiler, snapshot, peak)
+        except OSError as e:
+            log.warning("Unable to write the profile of %s to %s: %s", label, directory, e)
+        else:
+            log.info("Profile of %s written to %s", label, " and ".join(paths))
+
+
+def _write_report(
+    directory: str, label: str, profiler: cProfile.Profile, snapshot: tracemalloc.Snapshot, peak: int
+) -> list[str]:
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{label}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}")
+
+    profiler.dump_stats(f"{base}.prof")
+
+    report = io.StringIO()
+    report.write(f"Peak traced memory: {peak / 1024:.1f} KiB\n\n")
+    report.write(f"Top {TOP_ALLOCATIONS} allocation sites still alive at the end:\n")
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+    )
+    for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+        report.write(f"  {stat}\n")
+    report.write("\n")
+    pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+    with open(f"{base}.txt", "w") as f:
+        f.write(report.getvalue())
+    return [f"{base}.prof", f"{base}.txt"]
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import contextlib
 import enum
+import functools
 import json
 import os
 import platform
@@ -11,23 +13,44 @@ import threading
 import time
 from datetime import timedelta
 from functools import wraps
-from typing import Any, Callable, Sequence, TypeVar, cast
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Sequence, TypeVar, cast
 
-import distro
-import pendulum
-import requests
-import sqlalchemy.exc
-from airflow.configuration import conf
+from airflow.configuration import AIRFLOW_HOME, conf
+from airflow.stats import Stats
 from airflow.utils.log.logging_mixin import LoggingMixin
 from airflow.utils.session import create_session
 from airflow.utils.timezone import utcnow
-from flask import flash, g, redirect, render_template, request
-from requests.exceptions import HTTPError, SSLError
-from semver import Version as version
-from sqlalchemy import or_
+from sqlalchemy import not_, or_
+
+from astronomer.airflow.version_check.backoff import Backoff, FailureKind, UpdateCheckError, parse_retry_after
+from astronomer.airflow.version_check.document_cache import CHUNK_SIZE, CachedDocument, DocumentCache
+from astronomer.airflow.version_check.models.replica import create_read_session
+
+if TYPE_CHECKING:
+    from semver import Version
+
+# This module is imported wherever the plugin's notices are shown, so the
+# libraries that only the update check (or only the UI) needs are imported
+# where they are used rather than here
 
 T = TypeVar("T", bound=Callable)
 
+# Largest update document (after decompression) that is accepted, in bytes
+DEFAULT_MAX_DOCUMENT_SIZE = 32 * 1024 * 1024
+
+# How long, on top of the fetch deadline, a check may take to process and
+# write the update document before its claim can be taken over, in seconds
+CLAIM_LEASE_MARGIN = 5 * 60
+
+# Every metric this plugin emits is named under this prefix
+METRIC_PREFIX = "astronomer.version_check"
+
+
+def _metric(name: str) -> str:
+    return f"{METRIC_PREFIX}.{name}"
+
+
 # Code is placed in this file as the default Airflow logging config shows the
 # file name (not the logger name) so this prefixes our log messages with
 # "update_checks.py"
@@ -49,6 +72,8 @@ def has_access_(permissions: Sequence[tuple[str, str]]) -> Callable[[T], T]:
         :param kwargs: the keyword arguments ``func``
         :meta private:
         """
+        from flask import flash, g, redirect, render_template, request
+
         if is_authorized:
             return func(*args, **kwargs)
         elif get_auth_manager().is_logged_in() and not g.user.perms:
@@ -80,14 +105,40 @@ def has_access_(permissions: Sequence[tuple[str, str]]) -> Callable[[T], T]:
     return has_access_decorator
 
 
-def parse_new_version(version_str):
+_VERSION_RE = re.compile(r"(\d+)\.(\d+)(?:-(\d+))?")
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_version_key(version_str) -> tuple[int, int, int] | None:
     """
-    Parse versions like '3.0-1-nightly20241216'.
+    Parse versions like '3.0-1-nightly20241216' into a ``(major, minor, patch)``
+    tuple of ints, which is cheap to compare and sort on.
+
+    Returns ``None`` if ``version_str`` is not a runtime version.
     """
-    # Extract major, minor, patch and metadata from version
-    match = re.match(r"(\d+)\.(\d+)(?:-(\d+))?", version_str)
+    if not isinstance(version_str, str):
+        return None
+    # Extract major, minor, patch and ignore any metadata after them
+    match = _VERSION_RE.match(version_str)
+    if not match:
+        return None
     major, minor, patch = match.groups()
-    return version.parse(f"{major}.{minor}.{patch}")
+    return int(major), int(minor), int(patch or 0)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_new_version(version_str) -> Version | None:
+    """
+    Parse versions like '3.0-1-nightly20241216'.
+
+    Returns ``None`` if ``version_str`` is not a runtime version.
+    """
+    key = parse_version_key(version_str)
+    if key is None:
+        return None
+    from semver import Version
+
+    return Version(*key)
 
 
 # This code is introduced to maintain backward compatibility, since with airflow > 2.8
@@ -98,6 +149,11 @@ except ImportError:
     has_access = has_access_
 
 
+# Returned by ``CheckThread._get_update_json`` when the server answers a
+# conditional request with 304 Not Modified
+NOT_MODIFIED = object()
+
+
 class UpdateResult(enum.Enum):
     FAILURE = enum.auto()
     NOT_DUE = enum.auto()
@@ -112,11 +168,52 @@ class CheckThread(threading.Thread, LoggingMixin):
         self.check_interval_secs = conf.getint("astronomer", "update_check_interval", fallback=24 * 60 * 60)
         self.check_interval = timedelta(seconds=self.check_interval_secs)
         self.request_timeout = conf.getint("astronomer", "update_check_timeout", fallback=60)
+        # Unlike the request timeout, which applies to each read from the socket, this bounds the whole download
+        self.fetch_deadline = conf.getint("astronomer", "update_check_deadline", fallback=self.request_timeout)
+        self.claim_lease = timedelta(seconds=self.fetch_deadline + CLAIM_LEASE_MARGIN)
+        self.max_document_size = conf.getint(
+            "astronomer", "update_max_document_size", fallback=DEFAULT_MAX_DOCUMENT_SIZE
+        )
         self.base_url = conf.get("api", "base_url", fallback="/")
         self.runtime_version = get_runtime_version()
         self.update_url = conf.get(
             "astronomer", "update_url", fallback="https://updates.astronomer.io/astronomer-runtime"
         )
+        # Parse the update document while it downloads instead of loading it whole
+        self.stream_update_document = conf.getboolean("astronomer", "update_check_stream", fallback=False)
+        # A local file or directory of snapshots to read the update document
+        # from instead of update_url, for clusters without egress
+        self.update_source = conf.get("astronomer", "update_source", fallback=None) or None
+        # Share fetched update documents between the processes on this node
+        cache_max_age = conf.getint("astronomer", "update_cache_max_age", fallback=0)
+        self.document_cache = None
+        if cache_max_age > 0:
+            cache_path = conf.get(
+                "astronomer",
+                "update_cache_path",
+                fallback=os.path.join(AIRFLOW_HOME, "astronomer_update_document.cache"),
+            )
+            self.document_cache = DocumentCache(cache_path, max_age=cache_max_age)
+        # Validators of the most recently fetched update document
+        self.etag = None
+        self.last_modified = None
+
+        # Set to make the thread exit, and to cut a sleep short respectively
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._check_requested = threading.Event()
+        # How often to look for checks requested by other processes (see
+        # AstronomerVersionCheck.request_check) while sleeping. Each look is a
+        # query of the metadata database, so by default (0) they never happen.
+        self.trigger_poll_interval = conf.getint("astronomer", "update_check_trigger_poll_interval", fallback=0)
+        # Number of upcoming checks to profile, to find out where a slow check spends its time
+        self.profile_checks = conf.getint("astronomer", "profile_checks", fallback=0)
+        self.profile_directory = os.path.join(
+            conf.get("logging", "base_log_folder", fallback=os.path.join(AIRFLOW_HOME, "logs")),
+            "astronomer_version_check",
+        )
+        # Consecutive failures, which decide how long to wait before retrying
+        self.backoff = Backoff()
 
         if conf.getboolean("astronomer", "_fake_check", fallback=False):
             self._get_update_json = self._make_fake_runtime_response
@@ -130,117 +227,320 @@ class CheckThread(threading.Thread, LoggingMixin):
             self.log.info("Update checks disabled")
             return
 
-        self.hide_old_versions()
+        hidden = self.hide_old_versions()
+        self.log.debug("Hid %d versions that are not newer than the running version", hidden)
 
         # On start up sleep for a small amount of time (to give the scheduler time to start up properly)
         rand_delay = random.uniform(5, 20)
         self.log.debug("Waiting %d seconds before doing first check", rand_delay)
-        time.sleep(rand_delay)
+        self._sleep(rand_delay)
 
-        while True:
+        while not self._stop_event.is_set():
+            force = self._check_requested.is_set()
+            self._check_requested.clear()
             try:
-                update_available, wake_up_in = self.check_for_update()
+                update_available, wake_up_in = self.check_for_update(force=force)
                 if update_available == UpdateResult.SUCCESS_UPDATE_AVAIL:
                     self.log.info("A new version of Astronomer Runtime is available")
                 self.log.info("Check finished, next check in %s seconds", wake_up_in)
+            except UpdateCheckError as e:
+                wake_up_in = self._record_failure(e.kind, e.retry_after)
+                self.log.warning(
+                    "Update check failed (%s): %s, trying again in %d seconds (%d consecutive failures)",
+                    e.kind.name,
+                    e,
+                    wake_up_in,
+                    self.backoff.consecutive_failures,
+                )
             except Exception:
-                self.log.exception("Update check died with an exception, trying again in one hour")
-                wake_up_in = 3600
+                wake_up_in = self._record_failure(FailureKind.UNKNOWN)
+                self.log.exception("Update check died with an exception, trying again in %d seconds", wake_up_in)
+
+            Stats.gauge(_metric("next_check_seconds"), wake_up_in)
+            self._sleep(wake_up_in)
+
+        self.log.debug("Update check thread stopped")
 
-            time.sleep(wake_up_in)
+    def _record_failure(self, kind: FailureKind, retry_after: float | None = None) -> float:
+        """Count a failed check, returning how long to wait before the next one."""
+        wake_up_in = self.backoff.failure(kind, retry_after)
+        Stats.incr(_metric(f"check.failure.{kind.name.lower()}"))
+        Stats.gauge(_metric("check.consecutive_failures"), self.backoff.consecutive_failures)
+        return wake_up_in
+
+    def _sleep(self, seconds: float) -> None:
+        """
+        Sleep for ``seconds``, or until ``stop`` or ``trigger_check`` is called,
+        or another process requests a check with ``AstronomerVersionCheck.request_check``.
+        """
+        deadline = time.monotonic() + max(seconds, 0)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            poll = 0 < self.trigger_poll_interval < remaining
+            if self._wake_event.wait(self.trigger_poll_interval if poll else remaining):
+                self._wake_event.clear()
+                return
+            if poll and self._check_requested_elsewhere():
+                self._check_requested.set()
+                return
+
+    def _check_requested_elsewhere(self) -> bool:
+        from astronomer.airflow.version_check.models.db import AstronomerVersionCheck
+
+        try:
+            with create_session() as session:
+                return AstronomerVersionCheck.check_requested(session)
+        except Exception:
+            self.log.debug("Unable to look for requested update checks", exc_info=True)
+            return False
+
+    def trigger_check(self) -> None:
+        """
+        Run a check straight away, even if the next one is not due yet.
+
+        This only reaches the thread in the current process, other processes
+        should use ``AstronomerVersionCheck.request_check``.
+        """
+        self._check_requested.set()
+        self._wake_event.set()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Ask the thread to exit.
+
+        :param timeout: If given, wait up to this many seconds for a check
+            that is in progress to finish.
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        if timeout is not None and self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
 
     @staticmethod
-    def hide_old_versions():
-        """Hide Old Versions from displaying in the UI"""
-        from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion
+    def hide_old_versions() -> int:
+        """
+        Hide Old Versions from displaying in the UI
+
+        ``hidden_from_ui`` is part of the content hash of a release, so the
+        hashes of the hidden rows (and of the last check) are cleared too, and
+        the next check writes them again if the update document disagrees.
+
+        The validators of an update document processed by another runtime
+        version are cleared as well, so the next check processes it again.
+
+        :return: The number of versions that were hidden
+        """
+        from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion, AstronomerVersionCheck
+
+        runtime_version = parse_version_key(get_runtime_version())
+        if runtime_version is None:
+            return 0
 
         with create_session() as session:
-            available_releases = session.query(AstronomerAvailableVersion).filter(
-                AstronomerAvailableVersion.hidden_from_ui.is_(False)
+            session.query(AstronomerVersionCheck).filter(
+                AstronomerVersionCheck.singleton.is_(True),
+                or_(
+                    AstronomerVersionCheck.validators_runtime_version.is_(None),
+                    AstronomerVersionCheck.validators_runtime_version != get_runtime_version(),
+                ),
+            ).update(
+                {
+                    AstronomerVersionCheck.etag: None,
+                    AstronomerVersionCheck.last_modified: None,
+                    AstronomerVersionCheck.validators_runtime_version: None,
+                },
+                synchronize_session=False,
             )
+            hidden = (
+                session.query(AstronomerAvailableVersion)
+                .filter(
+                    AstronomerAvailableVersion.hidden_from_ui.is_(False),
+                    AstronomerAvailableVersion.major.isnot(None),
+                    not_(AstronomerAvailableVersion.newer_than(runtime_version)),
+                )
+                .update(
+                    {AstronomerAvailableVersion.hidden_from_ui: True, AstronomerAvailableVersion.content_hash: None},
+                    synchronize_session=False,
+                )
+            )
+            if hidden:
+                session.query(AstronomerVersionCheck).filter(AstronomerVersionCheck.singleton.is_(True)).update(
+                    {AstronomerVersionCheck.releases_hash: None}, synchronize_session=False
+                )
 
-            runtime_version = parse_new_version(get_runtime_version())
-            for rel in available_releases:
-                if runtime_version >= parse_new_version(rel.version):
-                    rel.hidden_from_ui = True
+        if hidden:
+            notice_cache.invalidate()
+        return hidden
 
-    def check_for_update(self):
+    def check_for_update(self, force: bool = False):
         """
+        :param force: Perform the check even if the next one isn't due yet
         :return: The time to sleep for before the next check should be performed
         :rtype: float
         """
-        from astronomer.airflow.version_check.models.db import AstronomerVersionCheck
+        profile = contextlib.nullcontext()
+        if self.profile_checks > 0:
+            from astronomer.airflow.version_check.profiling import profiled
+
+            self.profile_checks -= 1
+            profile = profiled(self.profile_directory, "update-check")
+
+        with profile, Stats.timer(_metric("check.duration")):
+            result, wake_up_in = self._check_for_update(force)
+        Stats.incr(_metric(f"check.{result.name.lower()}"))
+        return result, wake_up_in
 
+    def _check_for_update(self, force: bool):
+        from requests.exceptions import RequestException
+
+        from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion, AstronomerVersionCheck
+        from astronomer.airflow.version_check.models.lock import CheckLockContended
+
+        # Claim the check in a transaction of its own, so that no transaction
+        # (or pooled connection) is held while waiting on the network
         with create_session() as session:
-            try:
-                lock = AstronomerVersionCheck.acquire_lock(self.check_interval, session=session)
-            except sqlalchemy.exc.OperationalError as e:
-                if hasattr(e.orig, "pgcode") and e.orig.pgcode == "55P03":
-                    self.log.debug("Could not acquire lock, or check not due, sleeping for 60s+/-10s")
-                    return UpdateResult.FAILURE, random.uniform(50, 70)
-                raise
-
-            if not lock:
-                next_check = AstronomerVersionCheck.get(session).last_checked + self.check_interval
+            claim = AstronomerVersionCheck.claim_check(
+                timedelta(0) if force else self.check_interval, session=session, lease=self.claim_lease
+            )
+
+            if not claim:
+                row = AstronomerVersionCheck.get(session)
+                next_check = row.last_checked + self.check_interval
+                if row.results_checked_at != row.last_checked:
+                    # Another process has claimed the check, look again once its lease is up in case it died
+                    next_check = min(next_check, row.last_checked + self.claim_lease)
                 how_long = (next_check - utcnow()).total_seconds()
                 self.log.debug("Next check not due until %s (%s seconds away)", next_check, how_long)
                 return UpdateResult.NOT_DUE, how_long
 
-            self.log.info(
-                "Checking for new version of Astronomer Runtime, previous check was performed at %s",
-                lock.last_checked,
-            )
+        self.log.info(
+            "Checking for new version of Astronomer Runtime, previous check was performed at %s",
+            claim.previously_checked_at,
+        )
 
-            lock.last_checked = utcnow()
-            lock.last_checked_by = lock.host_identifier()
+        result = UpdateResult.SUCCESS_NO_UPDATE
 
-            # Issue the SQL for the above update, but don't commit the transaction
-            session.flush()
+        if claim.validators_runtime_version == self.runtime_version:
+            self.etag, self.last_modified = claim.etag, claim.last_modified
+        else:
+            # The document was processed for another version (before a rollback,
+            # say), so releases this version needs may not have been written
+            self.etag = self.last_modified = None
+        try:
+            update_document = self._get_update_json()
+            if update_document is NOT_MODIFIED:
+                self.log.info("Update document has not changed since the previous check")
+                with create_session() as session:
+                    AstronomerVersionCheck.complete_claim(claim, session=session)
+                self.backoff.success()
+                return result, self.check_interval.total_seconds()
 
-            result = UpdateResult.SUCCESS_NO_UPDATE
+            try:
+                releases = list(self._process_update_json(update_document))
+                releases_hash = AstronomerAvailableVersion.hash_releases(releases)
+            except RequestException as e:
+                # A streamed document is downloaded as it is processed
+                raise UpdateCheckError(FailureKind.NETWORK, f"Error fetching update document: {e}") from e
+            except (AttributeError, KeyError, TypeError, ValueError) as e:
+                raise UpdateCheckError(FailureKind.MALFORMED, f"Malformed update document: {e!r}") from e
+        except Exception:
+            self._release_claim(claim)
+            raise
 
-            for release in self._process_update_json(self._get_update_json()):
-                if not session.query(type(release)).get(release.version):
-                    self.log.info("Found %s in update document", release.version)
-                    session.add(release)
-                    result = UpdateResult.SUCCESS_UPDATE_AVAIL
+        try:
+            # The session is closed (and committed) before the lock is released
+            with AstronomerVersionCheck.check_lock(), create_session() as session:
+                row = AstronomerVersionCheck.holds_claim(claim, session=session)
+                if row is None:
+                    self.log.info("Update check was taken over by another process, discarding its results")
+                    Stats.incr(_metric("claim.lost"))
+                    return UpdateResult.FAILURE, self._record_failure(FailureKind.CONTENDED)
+
+                Stats.gauge(_metric("releases.processed"), len(releases))
+                if row.releases_hash == releases_hash:
+                    # The claim has already moved last_checked on, there's nothing else to write
+                    self.log.info("Releases in update document have not changed since the previous check")
+                    Stats.incr(_metric("releases.unchanged"))
                 else:
-                    self.log.debug("Updating existing update record for %s", release.version)
-                    # Update the record if needed.
-                    session.merge(release)
+                    # Looked up once, to find both the releases to write and which of them are new
+                    versions = [rel.version for rel in releases]
+                    stored = AstronomerAvailableVersion.stored_hashes(versions, session=session)
+                    changed = AstronomerAvailableVersion.changed_releases(releases, session=session, stored=stored)
+                    new_versions = AstronomerAvailableVersion.upsert(changed, session=session, existing=stored.keys())
+                    for new_version in new_versions:
+                        self.log.info("Found %s in update document", new_version)
+                        result = UpdateResult.SUCCESS_UPDATE_AVAIL
+                    self.log.debug("Updated %d existing update records", len(changed) - len(new_versions))
+                    Stats.incr(_metric("releases.inserted"), len(new_versions))
+                    Stats.incr(_metric("releases.updated"), len(changed) - len(new_versions))
+                    row.releases_hash = releases_hash
+
+                row.etag, row.last_modified = self.etag, self.last_modified
+                row.validators_runtime_version = self.runtime_version
+                row.results_checked_at = claim.checked_at
+        except CheckLockContended:
+            self._release_claim(claim)
+            Stats.incr(_metric("lock.contended"))
+            wake_up_in = self._record_failure(FailureKind.CONTENDED)
+            self.log.debug("Could not acquire lock, sleeping for %d seconds", wake_up_in)
+            return UpdateResult.FAILURE, wake_up_in
+        except Exception:
+            # A lost connection, say. Nothing was written, so let the next attempt retry straight away.
+            self._release_claim(claim)
+            raise
+
+        self.backoff.success()
+        # The new rows are committed now, so stop serving notices computed from the old ones
+        notice_cache.invalidate()
+        return result, self.check_interval.total_seconds()
+
+    def _release_claim(self, claim):
+        from astronomer.airflow.version_check.models.db import AstronomerVersionCheck
 
-            return result, self.check_interval.total_seconds()
+        try:
+            with create_session() as session:
+                AstronomerVersionCheck.release_claim(claim, session=session)
+        except Exception:
+            self.log.warning("Unable to release the update check claim", exc_info=True)
 
     def _process_update_json(self, update_document):
+        import pendulum
+
         from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion
 
         versions = self._convert_runtime_versions(update_document.get("runtimeVersionsV3", {}))
 
-        current_version = parse_new_version(self.runtime_version)
-
-        self.log.debug(
-            "Raw versions in update document: %r",
-            list(r["version"] for r in versions),
-        )
-
-        def parse_version(rel):
-            rel["parsed_version"] = parse_new_version(rel["version"])
-            return rel
-
-        releases = map(parse_version, versions)
+        current_version = parse_version_key(self.runtime_version)
+        if current_version is None:
+            self.log.warning("Unable to parse the running version %r, ignoring update document", self.runtime_version)
+            return
 
-        for release in sorted(releases, key=lambda rel: rel["parsed_version"], reverse=True):
-            parsed_ver = release["parsed_version"]
-            if release["channel"] in ["alpha", "beta"]:  # ignore alpha & beta releases
+        # Select the releases we care about in a single pass, so only those
+        # newer than the running version have to be kept and sorted
+        releases = []
+        total = 0
+        for rel in versions:
+            total += 1
+            if rel["channel"] in ["alpha", "beta"]:  # ignore alpha & beta releases
+                continue
+            parsed_ver = parse_version_key(rel["version"])
+            if parsed_ver is None:
+                self.log.debug("Ignoring unparsable version %r in update document", rel["version"])
                 continue
             if parsed_ver < current_version:
-                self.log.debug(
-                    "Got to a release (%s) that is older than the running version (%s) -- stopping looking for more",
-                    parsed_ver,
-                    self.runtime_version,
-                )
-                break
+                continue
+            releases.append((parsed_ver, rel))
 
+        self.log.debug(
+            "%d of %d releases in update document are not older than the running version (%s)",
+            len(releases),
+            total,
+            self.runtime_version,
+        )
+
+        for parsed_ver, release in sorted(releases, key=lambda pair: pair[0], reverse=True):
             release_date = (
                 pendulum.parse(release["release_date"], timezone="UTC")
                 if "release_date" in release
@@ -274,8 +574,9 @@ class CheckThread(threading.Thread, LoggingMixin):
     def _convert_runtime_versions(self, runtime_versions):
         """
         Convert the runtime update document values into the format we can
-        store in the database.
-        runtime_versions is a dict of dicts, with the keys being the version:
+        store in the database, one release at a time.
+        runtime_versions is a dict of dicts, with the keys being the version
+        (or an iterable of the same ``(version, value)`` pairs when streaming):
              {
                 "2.1.1": {
                     "metadata": {
@@ -288,8 +589,8 @@ class CheckThread(threading.Thread, LoggingMixin):
                     "migrations": {"airflowDatabase": "true"},
                 },
             }
-        output:
-            [{
+        yields:
+            {
                 "version": "2.1.1",
                 "level": "",
                 "channel": "deprecated",
@@ -299,10 +600,11 @@ class CheckThread(threading.Thread, LoggingMixin):
                 "end_of_maintenance": "2022-02-28",
                 "end_of_basic_support": "2022-08-28",
                 "yanked": False
-            }]
+            }
         """
-        versions = []
-        for k, v in runtime_versions.items():
+        if isinstance(runtime_versions, dict):
+            runtime_versions = runtime_versions.items()
+        for k, v in runtime_versions:
             metadata = v["metadata"]
             new_dict = {}
             new_dict["version"] = k
@@ -314,8 +616,7 @@ class CheckThread(threading.Thread, LoggingMixin):
             new_dict["end_of_maintenance"] = metadata.get("endOfMaintenance")
             new_dict["end_of_basic_support"] = metadata.get("endOfBasicSupport")
             new_dict["yanked"] = metadata.get("yanked", False)
-            versions.append(new_dict)
-        return versions
+            yield new_dict
 
     def _make_fake_runtime_response(self):
         v = parse_new_version(self.runtime_version)
@@ -340,24 +641,310 @@ class CheckThread(threading.Thread, LoggingMixin):
         }
 
     def _get_update_json(self):  # pylint: disable=E0202
-        json_data = get_user_string_data()
+        """
+        Fetch the update document.
+
+        If we have validators from a previous fetch the request is made
+        conditional, and ``NOT_MODIFIED`` is returned when the server says the
+        document hasn't changed. Otherwise ``self.etag`` and
+        ``self.last_modified`` are updated from the response.
+
+        In streaming mode the ``runtimeVersionsV3`` member of the returned
+        document is a generator of ``(version, value)`` pairs that are parsed
+        as the body is read.
+
+        If the node-local document cache is enabled, a fresh enough copy in it
+        is used instead of making a request, and fetched documents are saved to it.
+
+        If ``update_source`` is set the document is read from there instead,
+        without any network access.
+
+        The download fails with ``TOO_LARGE`` once the document grows past
+        ``max_document_size``, and with ``DEADLINE_EXCEEDED`` once it has taken
+        longer than ``fetch_deadline`` seconds in total.
+        """
+        if self.update_source:
+            return self._get_local_update_json()
+
+        import requests
+        from requests.exceptions import RequestException
+
+        cache = self.document_cache
+        if cache is not None:
+            cached = cache.load_fresh()
+            if cached is not None:
+                return self._use_cached_document(cached)
+
+        deadline = time.monotonic() + self.fetch_deadline
+        default_headers, params = get_request_defaults(self.runtime_version, self.base_url)
+        headers = dict(default_headers)
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
         try:
-            r = requests.get(
-                self.update_url,
-                timeout=self.request_timeout,
-                params={
-                    "site": self.base_url,
-                },
-                headers={"User-Agent": f"airflow/{self.runtime_version} {json_data}"},
+            # Only covers the response headers, the body is timed as it is read by _read_response
+            with Stats.timer(_metric("fetch.duration")):
+                # Always streamed, so the size and deadline can be checked as the body arrives
+                r = requests.get(
+                    self.update_url,
+                    timeout=min(self.request_timeout, self.fetch_deadline),
+                    params=params,
+                    headers=headers,
+                    stream=True,
+                )
+        except RequestException as e:
+            # Timeouts, refused connections, TLS failures and the like
+            raise UpdateCheckError(FailureKind.NETWORK, f"Error fetching update document: {e}") from e
+
+        Stats.incr(_metric(f"fetch.status.{r.status_code}"))
+        if r.status_code == 304:
+            r.close()
+            if cache is not None:
+                self._refresh_cached_document(cache)
+            return NOT_MODIFIED
+        if r.status_code >= 400:
+            r.close()
+            message = f"Error fetching update document: HTTP {r.status_code}"
+            if r.status_code == 429:
+                retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                raise UpdateCheckError(FailureKind.RATE_LIMITED, message, retry_after=retry_after)
+            if r.status_code >= 500:
+                raise UpdateCheckError(FailureKind.SERVER_ERROR, message)
+            raise UpdateCheckError(FailureKind.UNKNOWN, message)
+
+        self._check_response_headers(r)
+        self.etag = r.headers.get("ETag")
+        self.last_modified = r.headers.get("Last-Modified")
+        chunks = self._count_response_bytes(self._read_response(r, deadline))
+        if self.stream_update_document:
+            if cache is not None:
+                return self._cache_streamed_response(cache, r, chunks)
+            return {"runtimeVersionsV3": self._stream_runtime_versions(chunks, r.close)}
+
+        try:
+            body = b"".join(chunks)
+        finally:
+            r.close()
+        if cache is not None:
+            try:
+                cache.store([body], self.etag, self.last_modified)
+            except OSError as e:
+                self.log.warning("Unable to write the update document cache: %s", e)
+        return self._parse_document(body)
+
+    def _check_response_headers(self, response) -> None:
+        """Reject a response we can't decode, or that says up front that it is too large."""
+        encoding = response.headers.get("Content-Encoding", "identity").lower()
+        if encoding not in ("identity", *accepted_encodings()):
+            response.close()
+            raise UpdateCheckError(
+                FailureKind.MALFORMED, f"Update document was sent with an unsupported encoding {encoding!r}"
             )
-            r.raise_for_status()
-            return r.json()
-        except (SSLError, HTTPError) as e:
-            self.log.warning("Error fetching update document: %s", e)
-            pass
+
+        # This is the size on the wire, the decompressed size is checked as the body is read
+        content_length = response.headers.get("Content-Length", "")
+        if self.max_document_size and content_length.isdigit() and int(content_length) > self.max_document_size:
+            response.close()
+            raise UpdateCheckError(
+                FailureKind.TOO_LARGE,
+                f"Update document is {content_length} bytes, the limit is {self.max_document_size} bytes",
+            )
+
+    def _read_response(self, response, deadline: float):
+        """
+        Yield the decompressed body of ``response``, failing once it is larger
+        than ``max_document_size`` or the fetch has gone on past ``deadline``.
+
+        The deadline is checked as each chunk arrives, so it can be overrun by
+        one read of at most ``update_check_timeout`` seconds.
+
+        The time taken to read the body is emitted once it has been read (or
+        reading it failed). When streaming this includes parsing it.
+        """
+        from requests.exceptions import ContentDecodingError, RequestException
+
+        size = 0
+        started = time.monotonic()
+        try:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                size += len(chunk)
+                if self.max_document_size and size > self.max_document_size:
+                    raise UpdateCheckError(
+                        FailureKind.TOO_LARGE,
+                        f"Update document is larger than the limit of {self.max_document_size} bytes",
+                    )
+                if time.monotonic() > deadline:
+                    raise UpdateCheckError(
+                        FailureKind.DEADLINE_EXCEEDED,
+                        f"Fetching the update document took longer than {self.fetch_deadline} seconds",
+                    )
+                yield chunk
+        except ContentDecodingError as e:
+            raise UpdateCheckError(FailureKind.MALFORMED, f"Unable to decompress update document: {e}") from e
+        except RequestException as e:
+            raise UpdateCheckError(FailureKind.NETWORK, f"Error fetching update document: {e}") from e
+        finally:
+            Stats.timing(_metric("fetch.download.duration"), timedelta(seconds=time.monotonic() - started))
+
+    def _get_local_update_json(self):
+        from astronomer.airflow.version_check.local_source import load_local_document
+
+        document = load_local_document(self.update_source)
+        # self.etag is only set from a snapshot processed by this runtime version,
+        # so after a rollback an unchanged snapshot is processed again
+        if document.etag == self.etag:
+            document.close()
+            self.log.info("Update document in %s has not changed since the previous check", self.update_source)
+            return NOT_MODIFIED
+
+        self.etag, self.last_modified = document.etag, None
+        return self._read_cached_document(document)
+
+    def _use_cached_document(self, cached: CachedDocument):
+        # self.etag and self.last_modified are only set from a document processed
+        # by this runtime version, so after a rollback the cached one is read again
+        if (cached.etag or cached.last_modified) and (cached.etag, cached.last_modified) == (
+            self.etag,
+            self.last_modified,
+        ):
+            cached.close()
+            self.log.info("Update document in the node cache has already been processed")
+            return NOT_MODIFIED
+
+        self.log.info("Using the update document fetched %d seconds ago from the node cache", cached.age())
+        self.etag, self.last_modified = cached.etag, cached.last_modified
+        return self._read_cached_document(cached)
+
+    def _refresh_cached_document(self, cache: DocumentCache) -> None:
+        """Mark the cached document as fresh again, if it is the one the server just told us is unchanged."""
+        cached = cache.load()
+        if cached is None:
+            return
+        if (cached.etag, cached.last_modified) != (self.etag, self.last_modified):
+            cached.close()
+            return
+        try:
+            cache.store(cached.chunks(), cached.etag, cached.last_modified)
+        except OSError as e:
+            self.log.warning("Unable to write the update document cache: %s", e)
+
+    def _cache_streamed_response(self, cache: DocumentCache, response, chunks):
+        """Save the response body to the cache, and return the document streamed back from it."""
+        try:
+            with cache.writer(self.etag, self.last_modified) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except OSError as e:
+            # Part of the body has been consumed, so it can't be parsed any more
+            raise UpdateCheckError(FailureKind.UNKNOWN, f"Unable to write the update document cache: {e}") from e
+        finally:
+            response.close()
+
+        cached = cache.load()
+        if cached is None:
+            raise UpdateCheckError(FailureKind.UNKNOWN, "Unable to read back the update document cache")
+        return self._read_cached_document(cached)
+
+    def _read_cached_document(self, cached: CachedDocument):
+        if self.stream_update_document:
+            return {"runtimeVersionsV3": self._stream_runtime_versions(cached.chunks(), cached.close)}
+        return self._parse_document(cached.read())
+
+    @staticmethod
+    def _parse_document(body: bytes):
+        try:
+            return json.loads(body)
+        except ValueError as e:
+            raise UpdateCheckError(FailureKind.MALFORMED, f"Update document is not valid JSON: {e}") from e
+
+    @staticmethod
+    def _count_response_bytes(chunks):
+        size = 0
+        try:
+            for chunk in chunks:
+                size += len(chunk)
+                yield chunk
+        finally:
+            Stats.gauge(_metric("fetch.response_bytes"), size)
+
+    @staticmethod
+    def _stream_runtime_versions(chunks, close):
+        from astronomer.airflow.version_check.json_stream import iter_object_items
+
+        try:
+            yield from iter_object_items(chunks, "runtimeVersionsV3")
+        finally:
+            close()
+
+
+class NoticeCache:
+    """
+    Thread-safe cache of the notices computed by ``UpdateAvailableHelper``.
+
+    Entries expire after ``ttl`` seconds (a ``ttl`` of 0 disables caching).
+    The cache lives in the current process only: ``invalidate`` clears it here,
+    other processes see the change once their own entries expire.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: dict[str, tuple[float, Any]] = {}
+        # Bumped on every invalidation so a value computed from data read
+        # before an invalidation is never stored after it
+        self._generation = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        if self.ttl <= 0:
+            return compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                Stats.incr(_metric("notice_cache.hit"))
+                return entry[1]
+            generation = self._generation
+
+        Stats.incr(_metric("notice_cache.miss"))
+        value = compute()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+notice_cache = NoticeCache(ttl=conf.getint("astronomer", "notice_cache_ttl", fallback=60))
+
+
+def cached_notice(fn: T) -> T:
+    """Serve the result of an ``UpdateAvailableHelper`` method from ``notice_cache``."""
+
+    @wraps(fn)
+    def wrapper(self):
+        def compute():
+            with Stats.timer(_metric(f"notice.{fn.__name__}.duration")):
+                return fn(self)
+
+        return notice_cache.get_or_compute(fn.__name__, compute)
+
+    return cast(T, wrapper)
 
 
 class UpdateAvailableHelper(LoggingMixin):
+    """
+    Works out the notices the plugin shows.
+
+    The notices are read through ``create_read_session``, so they come from the
+    read replica if one is configured; ``dismiss_eol`` writes to the primary.
+    """
+
     def __init__(self):
         from .plugin import dismissal_period_days, eol_warning_threshold_days
 
@@ -395,99 +982,178 @@ class UpdateAvailableHelper(LoggingMixin):
                     }
         return None
 
-    def available_update(self):
-        """Check if there is a new version of Astronomer Runtime available."""
+    @staticmethod
+    def get_yanked_notice(current_version) -> str | None:
+        """
+        Get the yanked warning if the current version has been yanked.
+
+        :param current_version: The current runtime version information.
+        """
+        if current_version and current_version.yanked:
+            return (
+                f"Warning: This version of Astronomer Runtime, {current_version.version}, has been yanked. "
+                "We strongly recommend upgrading to a more recent supported version."
+            )
+        return None
+
+    @staticmethod
+    def get_update_notice(release) -> dict[str, Any] | None:
+        """
+        Get the update notice for ``release``.
+
+        :param release: The release to notify about, as found by ``_find_update``.
+        """
+        if release is None:
+            return None
+        return {
+            "level": release.level,
+            "date_released": release.date_released,
+            "description": release.description,
+            "version": release.version,
+            "url": release.url,
+            "app_name": "Astronomer Runtime",
+        }
+
+    @staticmethod
+    def _get_current_version(session):
+        """Return the row of the running version, if we know about it."""
         from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion
 
-        with create_session() as session:
-            available_releases = session.query(AstronomerAvailableVersion).filter(
-                AstronomerAvailableVersion.hidden_from_ui.is_(False),
-                or_(AstronomerAvailableVersion.yanked.is_(False), AstronomerAvailableVersion.yanked.is_(None)),
+        return (
+            session.query(AstronomerAvailableVersion)
+            .filter(AstronomerAvailableVersion.version == str(get_runtime_version()))
+            .one_or_none()
+        )
+
+    @staticmethod
+    def _find_update(session):
+        """
+        Return the release to show in the update notice, in a single query.
+
+        Only notify about the latest release if the user is in the highest patch level.
+        On runtime:
+        if the user is on version 5.0.6 and 5.0.8, 6.0.0 are available,
+        notify the user about 5.0.8 and don't notify user about 6.0.0.
+        Failing that, the newest visible release is returned.
+        """
+        from sqlalchemy import select, union_all
+        from sqlalchemy.orm import aliased
+
+        from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion
+
+        runtime_version = parse_version_key(get_runtime_version())
+        if runtime_version is None:
+            return None
+        major, minor, patch = runtime_version
+
+        available_releases = session.query(AstronomerAvailableVersion).filter(
+            AstronomerAvailableVersion.hidden_from_ui.is_(False),
+            or_(AstronomerAvailableVersion.yanked.is_(False), AstronomerAvailableVersion.yanked.is_(None)),
+            AstronomerAvailableVersion.major.isnot(None),
+        )
+        # Versions that only differ after the patch level (nightlies, say) are
+        # ordered by their full version string, so the same one is always picked
+        newest_first = (
+            AstronomerAvailableVersion.major.desc(),
+            AstronomerAvailableVersion.minor.desc(),
+            AstronomerAvailableVersion.patch.desc(),
+            AstronomerAvailableVersion.version.desc(),
+        )
+        latest_in_major = (
+            available_releases.filter(
+                AstronomerAvailableVersion.major == major,
+                AstronomerAvailableVersion.newer_than(runtime_version),
             )
+            .order_by(*newest_first)
+            .limit(1)
+            .subquery()
+        )
+        latest = available_releases.order_by(*newest_first).limit(1).subquery()
 
-        runtime_version = parse_new_version(get_runtime_version())
-        base_version = runtime_version.major
-
-        sorted_releases = sorted(available_releases, key=lambda v: parse_new_version(v.version), reverse=True)
-        for rel in sorted_releases:
-            # Only notify about the latest release if the user is in the highest patch level.
-            # On runtime:
-            # if the user is on version 5.0.6 and 5.0.8, 6.0.0 are available,
-            # notify the user about 5.0.8 and don't notify user about 6.0.0.
-            rel_parsed_version = parse_new_version(rel.version)
-
-            rel_parsed_base_version = rel_parsed_version.major
-            if rel_parsed_version > runtime_version and rel_parsed_base_version == base_version:
-                return {
-                    "level": rel.level,
-                    "date_released": rel.date_released,
-                    "description": rel.description,
-                    "version": rel.version,
-                    "url": rel.url,
-                    "app_name": "Astronomer Runtime",
-                }
-
-        if sorted_releases:
-            recent_release = sorted_releases[0]
-            return {
-                "level": recent_release.level,
-                "date_released": recent_release.date_released,
-                "description": recent_release.description,
-                "version": recent_release.version,
-                "url": recent_release.url,
-                "app_name": "Astronomer Runtime",
-            }
+        # Both index probes go to the database as one UNION ALL
+        candidates = session.query(
+            aliased(AstronomerAvailableVersion, union_all(select(latest_in_major), select(latest)).subquery())
+        ).all()
+        if not candidates:
+            return None
+        for release in candidates:
+            if release.major == major and (release.minor, release.patch) > (minor, patch):
+                return release
+        return max(candidates, key=lambda rel: (rel.major, rel.minor, rel.patch, rel.version))
 
-        return None
+    @cached_notice
+    def version_status(self) -> dict[str, Any]:
+        """
+        Return the update, EOL and yanked notices together.
+
+        This gives the same answers as ``available_update``, ``available_eol``
+        and ``available_yanked`` but uses one session and two queries.
+        """
+        from .plugin import eol_warning_opt_out
+
+        with create_read_session() as session:
+            current_version = self._get_current_version(session)
+            release = self._find_update(session)
 
+        return {
+            "update": self.get_update_notice(release),
+            "eol": None if eol_warning_opt_out else self.get_eol_notice(current_version),
+            "yanked": self.get_yanked_notice(current_version),
+        }
+
+    @cached_notice
+    def available_update(self):
+        """Check if there is a new version of Astronomer Runtime available."""
+        with create_read_session() as session:
+            release = self._find_update(session)
+        return self.get_update_notice(release)
+
+    @cached_notice
     def available_eol(self) -> dict[str, Any] | None:
         """Check if there is an EOL notice for the current version of Astronomer Runtime."""
-        from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion
-
         from .plugin import eol_warning_opt_out
 
         if eol_warning_opt_out:
             return None
 
-        with create_session() as session:
-            runtime_version = get_runtime_version()
-            current_version = (
-                session.query(AstronomerAvailableVersion)
-                .filter(AstronomerAvailableVersion.version == str(runtime_version))
-                .one_or_none()
-            )
-            return self.get_eol_notice(current_version)
+        with create_read_session() as session:
+            return self.get_eol_notice(self._get_current_version(session))
 
-    def available_yanked(self) -> dict[str, Any] | None:
+    @cached_notice
+    def available_yanked(self) -> str | None:
         """Check if the current version of Astronomer Runtime is yanked."""
+        with create_read_session() as session:
+            return self.get_yanked_notice(self._get_current_version(session))
+
+    def dismiss_eol(self) -> None:
+        """Dismiss the EOL notice of the current version for ``dismissal_period_days``."""
         from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion
 
+        dismissed_until = utcnow() + timedelta(days=self.dismissal_period_days)
         with create_session() as session:
-            runtime_version = get_runtime_version()
-            current_version = (
-                session.query(AstronomerAvailableVersion)
-                .filter(
-                    AstronomerAvailableVersion.version == str(runtime_version),
-                    AstronomerAvailableVersion.yanked.is_(True),
-                )
-                .one_or_none()
-            )
+            session.query(AstronomerAvailableVersion).filter(
+                AstronomerAvailableVersion.version == str(get_runtime_version())
+            ).update({AstronomerAvailableVersion.eos_dismissed_until: dismissed_until}, synchronize_session=False)
 
-            if current_version and current_version.yanked:
-                return (
-                    f"Warning: This version of Astronomer Runtime, {runtime_version}, has been yanked. "
-                    "We strongly recommend upgrading to a more recent supported version."
-                )
-
-            return None
+        notice_cache.invalidate()
 
 
 def get_runtime_version():
     return os.environ.get("ASTRONOMER_RUNTIME_VERSION", None)
 
 
-def get_user_string_data():
-    data = {
+@functools.lru_cache(maxsize=1)
+def get_host_fingerprint() -> dict[str, Any]:
+    """
+    Describe the Python, OS and Airflow setup this process runs on.
+
+    This reads files (``/etc/os-release`` and the like), so it is only worked
+    out once per process; call ``refresh_host_fingerprint`` to do it again.
+    The returned dict is shared, don't modify it.
+    """
+    import distro
+
+    data: dict[str, Any] = {
         "python": platform.python_version(),
         "implementation": {
             "name": platform.python_implementation(),
@@ -522,4 +1188,38 @@ def get_user_string_data():
 
     data["ci"] = True if any(name in os.environ for name in ["BUILD_BUILDID", "BUILD_ID", "CI"]) else None
 
-    return json.dumps(data, separators=(",", ":"), sort_keys=True)
+    return data
+
+
+@functools.lru_cache(maxsize=1)
+def get_user_string_data() -> str:
+    return json.dumps(get_host_fingerprint(), separators=(",", ":"), sort_keys=True)
+
+
+@functools.lru_cache(maxsize=None)
+def accepted_encodings() -> tuple[str, ...]:
+    """Return the content encodings of the update document we can decompress."""
+    import urllib3.response
+
+    # zstd needs the zstandard package (or Python 3.14), gzip is always available
+    if getattr(urllib3.response, "HAS_ZSTD", False):
+        return ("zstd", "gzip")
+    return ("gzip",)
+
+
+@functools.lru_cache(maxsize=8)
+def get_request_defaults(runtime_version: str | None, base_url: str) -> tuple[Mapping[str, str], Mapping[str, str]]:
+    """Return the headers and query parameters sent with every request for the update document."""
+    headers = {
+        "User-Agent": f"airflow/{runtime_version} {get_user_string_data()}",
+        "Accept-Encoding": ", ".join(accepted_encodings()),
+    }
+    params = {"site": base_url}
+    return MappingProxyType(headers), MappingProxyType(params)
+
+
+def refresh_host_fingerprint() -> None:
+    """Work out the host fingerprint, and the request headers built from it, again on next use."""
+    get_request_defaults.cache_clear()
+    get_user_string_data.cache_clear()
+    get_host_fingerprint.cache_clear()
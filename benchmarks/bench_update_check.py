@@ -0,0 +1,225 @@
+"""
+Benchmark the update check pipeline against synthetic update documents.
+
+Generates ``runtimeVersionsV3`` documents of increasing size, runs each stage
+of the pipeline against a file-backed SQLite metadata database, and reports the
+best wall time and the peak traced memory of every stage::
+
+    python benchmarks/bench_update_check.py --sizes 10,1000,100000 --output results.json
+
+Pass ``--baseline`` with the output of an earlier run to compare against it.
+The script exits with status 1 if any stage got slower (or used more memory)
+than ``--threshold`` times its baseline.
+
+The database is created from scratch in a temporary directory, so running this
+doesn't touch your own Airflow installation.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, NamedTuple
+
+DEFAULT_SIZES = (10, 100, 1000, 10_000, 100_000)
+RUNNING_VERSION = "1.0-1"
+# Below this, differences in timings are noise
+MIN_SECONDS = 0.001
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable[[], Any]
+    setup: Callable[[], Any] = lambda: None
+
+
+def make_document(size: int) -> dict:
+    """Return an update document of ``size`` releases, one in twenty of them an alpha."""
+    released = datetime.date(2020, 1, 1)
+    versions = {}
+    for i in range(size):
+        major, minor, patch = 1 + i // 10_000, (i // 100) % 100, i % 100 + 1
+        version = f"{major}.{minor}-{patch}"
+        channel = "stable"
+        if i % 20 == 19:
+            version += f"-nightly{released:%Y%m%d}"
+            channel = "alpha"
+        metadata = {
+            "airflowVersion": f"3.{major}.{minor}",
+            "channel": channel,
+            "releaseDate": released.isoformat(),
+            "endOfMaintenance": (released + datetime.timedelta(days=365)).isoformat(),
+            "endOfBasicSupport": (released + datetime.timedelta(days=540)).isoformat(),
+        }
+        if i % 50 == 0:
+            metadata["yanked"] = True
+        versions[version] = {"metadata": metadata, "migrations": {"airflowDatabase": i % 10 == 0}}
+    return {"features": {}, "runtimeVersionsV3": versions}
+
+
+def configure_airflow(directory: str) -> None:
+    """Point Airflow at a fresh SQLite database in ``directory``, before anything imports it."""
+    os.environ["AIRFLOW_HOME"] = directory
+    os.environ["AIRFLOW__DATABASE__SQL_ALCHEMY_CONN"] = f"sqlite:///{os.path.join(directory, 'airflow.db')}"
+    os.environ["AIRFLOW__DATABASE__EXTERNAL_DB_MANAGERS"] = (
+        "astronomer.airflow.version_check.models.manager.VersionCheckDBManager"
+    )
+    os.environ["AIRFLOW__CORE__LOAD_EXAMPLES"] = "False"
+    os.environ["ASTRONOMER_RUNTIME_VERSION"] = RUNNING_VERSION
+
+
+def make_stages(document: dict) -> list[Stage]:
+    from airflow.utils.session import create_session
+
+    from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion, AstronomerVersionCheck
+    from astronomer.airflow.version_check.update_checks import CheckThread, UpdateAvailableHelper, notice_cache
+
+    thread = CheckThread()
+    thread.runtime_version = RUNNING_VERSION
+    thread._get_update_json = lambda: document
+    helper = UpdateAvailableHelper()
+    runtime_versions = document["runtimeVersionsV3"]
+    middle = list(runtime_versions)[len(runtime_versions) // 2]
+
+    def clear_versions():
+        with create_session() as session:
+            session.query(AstronomerAvailableVersion).delete()
+            session.query(AstronomerVersionCheck).update({"etag": None, "last_modified": None, "releases_hash": None})
+
+    def unhide_versions():
+        os.environ["ASTRONOMER_RUNTIME_VERSION"] = middle
+        with create_session() as session:
+            session.query(AstronomerAvailableVersion).update({"hidden_from_ui": False})
+
+    def hide_old_versions():
+        try:
+            return CheckThread.hide_old_versions()
+        finally:
+            os.environ["ASTRONOMER_RUNTIME_VERSION"] = RUNNING_VERSION
+
+    return [
+        Stage("convert_runtime_versions", lambda: list(thread._convert_runtime_versions(runtime_versions))),
+        Stage("process_update_json", lambda: list(thread._process_update_json(document))),
+        Stage("check_for_update_new", lambda: thread.check_for_update(force=True), setup=clear_versions),
+        Stage("check_for_update_unchanged", lambda: thread.check_for_update(force=True)),
+        Stage("hide_old_versions", hide_old_versions, setup=unhide_versions),
+        Stage("available_update", helper.available_update, setup=notice_cache.invalidate),
+        Stage("version_status", helper.version_status, setup=notice_cache.invalidate),
+    ]
+
+
+def measure(stage: Stage, repeat: int) -> dict[str, float]:
+    """Return the best time of ``repeat`` runs of ``stage``, and its peak memory in a separate traced run."""
+    timings = []
+    for _ in range(repeat):
+        stage.setup()
+        start = time.perf_counter()
+        stage.run()
+        timings.append(time.perf_counter() - start)
+
+    # Tracing slows everything down, so memory is measured on its own
+    stage.setup()
+    tracemalloc.start()
+    try:
+        stage.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def run(sizes: list[int], repeat: int) -> dict:
+    from airflow.utils.db import initdb
+
+    from astronomer.airflow.version_check.models.db import AstronomerVersionCheck
+
+    initdb()
+    AstronomerVersionCheck.ensure_singleton()
+
+    results: dict[str, dict] = {}
+    for size in sizes:
+        document = make_document(size)
+        results[str(size)] = size_results = {}
+        for stage in make_stages(document):
+            size_results[stage.name] = measure(stage, repeat)
+            print(
+                f"{size:>7} {stage.name:<28} {size_results[stage.name]['seconds'] * 1000:>10.2f} ms "
+                f"{size_results[stage.name]['peak_bytes'] / 1024:>10.0f} KiB",
+                file=sys.stderr,
+            )
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return a description of every stage that regressed by more than ``threshold`` times its baseline."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if previous is None:
+                continue
+            if current["seconds"] > MIN_SECONDS and current["seconds"] > previous["seconds"] * threshold:
+                regressions.append(
+                    f"{stage} with {size} releases took {current['seconds']:.4f}s, was {previous['seconds']:.4f}s"
+                )
+            if current["peak_bytes"] > previous["peak_bytes"] * threshold:
+                regressions.append(
+                    f"{stage} with {size} releases peaked at {current['peak_bytes']} bytes, "
+                    f"was {previous['peak_bytes']} bytes"
+                )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=list(DEFAULT_SIZES),
+        help="Comma separated numbers of releases to generate documents with",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of each stage")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results to this earlier output")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory(prefix="astro-version-check-bench-") as directory:
+        configure_airflow(directory)
+        results = run(args.sizes, args.repeat)
+
+    output = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
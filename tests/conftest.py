@@ -59,6 +59,15 @@ def unauthorized_test_client(request):
     yield TestClient(app, headers={"Authorization": f"Bearer {token}"}, base_url=f"{BASE_URL}{get_api_path(request)}")
 
 
+@pytest.fixture(autouse=True)
+def clear_notice_cache():
+    from astronomer.airflow.version_check.update_checks import notice_cache
+
+    notice_cache.invalidate()
+    yield
+    notice_cache.invalidate()
+
+
 @pytest.fixture
 def session():
     from airflow.utils.session import create_session
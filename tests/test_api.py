@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+from airflow.utils.session import create_session
+from airflow.utils.timezone import utcnow
+
+from astronomer.airflow.version_check.api import StatusState, etag_matches
+from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion, AstronomerVersionCheck
+from astronomer.airflow.version_check.plugin import STATUS_URL_PREFIX
+from astronomer.airflow.version_check.update_checks import UpdateAvailableHelper
+
+STATUS_URL = f"{STATUS_URL_PREFIX}/status"
+
+
+@pytest.fixture
+def runtime_version():
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": "3.0-1"}):
+        yield "3.0-1"
+
+
+def test_status(test_client, runtime_version):
+    last_checked = utcnow() - timedelta(hours=1)
+    with create_session() as session:
+        session.query(AstronomerAvailableVersion).delete()
+        session.query(AstronomerVersionCheck).delete()
+        session.add(AstronomerVersionCheck(singleton=True, last_checked=last_checked, results_checked_at=last_checked))
+        session.add(
+            AstronomerAvailableVersion(
+                version=runtime_version,
+                level="",
+                date_released=utcnow() - timedelta(days=100),
+                description="",
+                hidden_from_ui=False,
+                end_of_maintenance=utcnow() + timedelta(days=10),
+            )
+        )
+
+    response = test_client.get(STATUS_URL)
+    assert response.status_code == 200
+    assert response.json()["eol"]["version"] == runtime_version
+    assert response.json()["yanked"] is None
+    etag = response.headers["ETag"]
+    assert etag.startswith('"')
+    max_age = int(response.headers["Cache-Control"].split("max-age=")[1])
+    assert 0 < max_age <= 23 * 3600
+
+    # Unchanged, so the notices needn't be worked out again
+    with mock.patch.object(UpdateAvailableHelper, "version_status") as version_status:
+        response = test_client.get(STATUS_URL, headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    version_status.assert_not_called()
+
+    # Dismissing the EOL notice changes the status
+    UpdateAvailableHelper().dismiss_eol()
+    response = test_client.get(STATUS_URL, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["eol"] is None
+
+
+def test_status_requires_login(unauthorized_test_client):
+    assert unauthorized_test_client.get(STATUS_URL).status_code == 403
+
+
+def _state(last_checked, now, eos_dismissed_until=None, **kwargs):
+    return StatusState(
+        **{
+            "runtime_version": "3.0-1",
+            "last_checked": last_checked,
+            "results_checked_at": last_checked,
+            "releases_hash": None,
+            "visible_releases": 0,
+            "eos_dismissed_until": eos_dismissed_until,
+            "now": now,
+            **kwargs,
+        }
+    )
+
+
+def test_status_max_age():
+    now = datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc)
+    with mock.patch("astronomer.airflow.version_check.api.update_check_interval", 6 * 3600):
+        # Until the next check is due ...
+        assert _state(now - timedelta(hours=1), now).max_age() == 5 * 3600
+        # ... or, if sooner, the end of the dismissal ...
+        dismissed_until = now + timedelta(minutes=10)
+        assert _state(now - timedelta(hours=1), now, dismissed_until).max_age() == 600
+        # ... or the end of the day
+        late = now + timedelta(hours=10)
+        assert _state(late - timedelta(hours=1), late).max_age() == 2 * 3600
+        # Overdue, never checked, or a check is in progress
+        assert _state(now - timedelta(days=1), now).max_age() == 0
+        assert _state(None, now).max_age() == 0
+        assert _state(now - timedelta(hours=1), now, results_checked_at=now - timedelta(days=1)).max_age() == 0
+
+
+def test_status_changes_once_a_check_commits_its_results(runtime_version):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.api import get_status_state
+    from astronomer.airflow.version_check.update_checks import CheckThread
+
+    resetdb()
+    with create_session() as session:
+        session.add(AstronomerVersionCheck(singleton=True))
+
+    states = []
+
+    def fetch():
+        states.append(get_status_state())
+        return {"runtimeVersionsV3": {"3.0-2": {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}}}}
+
+    with mock.patch.object(CheckThread, "_get_update_json", side_effect=fetch):
+        CheckThread().check_for_update()
+
+    during, after = states[0], get_status_state()
+    # The check has been claimed, but its results could replace the status at any moment
+    assert during.check_in_progress
+    assert during.max_age() == 0
+    assert not after.check_in_progress
+    assert after.max_age() > 0
+    assert after.etag() != during.etag()
+
+    # Hiding releases changes the status without a check
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": "3.0-2"}):
+        CheckThread.hide_old_versions()
+    assert get_status_state().etag() != after.etag()
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ("*", True),
+        ('"xyz"', False),
+        ("abc", False),
+    ],
+)
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, '"abc"') is matches
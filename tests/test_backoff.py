@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from astronomer.airflow.version_check.backoff import Backoff, FailureKind, parse_retry_after
+
+
+def test_backoff_grows_to_its_cap():
+    backoff = Backoff({FailureKind.NETWORK: (10, 100)})
+    delays = [backoff.failure(FailureKind.NETWORK) for _ in range(10)]
+
+    assert backoff.consecutive_failures == 10
+    assert backoff.last_failure == FailureKind.NETWORK
+    ceilings = [10, 20, 40, 80, 100, 100, 100, 100, 100, 100]
+    for delay, ceiling in zip(delays, ceilings):
+        assert 0 <= delay <= ceiling
+
+    backoff.success()
+    assert backoff.consecutive_failures == 0
+    assert backoff.last_failure is None
+
+
+def test_backoff_counts_each_kind_separately():
+    backoff = Backoff({FailureKind.NETWORK: (10, 1000), FailureKind.CONTENDED: (1, 1000)})
+    for _ in range(5):
+        backoff.failure(FailureKind.NETWORK)
+
+    # The first contention starts from its own base, not where the network errors got to
+    assert 0 <= backoff.failure(FailureKind.CONTENDED) <= 1
+    assert backoff.consecutive_failures == 6
+    assert backoff.failures_by_kind == {FailureKind.NETWORK: 5, FailureKind.CONTENDED: 1}
+
+    backoff.success()
+    assert backoff.failures_by_kind == {}
+
+
+def test_backoff_is_jittered():
+    delays = {Backoff().failure(FailureKind.UNKNOWN) for _ in range(20)}
+    assert len(delays) > 1
+
+
+def test_backoff_honours_retry_after():
+    backoff = Backoff({FailureKind.RATE_LIMITED: (1, 1)})
+    assert backoff.failure(FailureKind.RATE_LIMITED, retry_after=600) == 600
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        ("", None),
+        ("120", 120),
+        ("not a date", None),
+        ("99999999", 24 * 3600),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(minutes=10)
+    assert 500 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 600
+    # Dates in the past mean "now"
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
@@ -0,0 +1,60 @@
+import os
+import time
+
+from astronomer.airflow.version_check.document_cache import DocumentCache
+
+
+def test_document_cache_round_trip(tmp_path):
+    cache = DocumentCache(str(tmp_path / "update.cache"), max_age=60)
+    assert cache.load() is None
+
+    cache.store([b'{"runtimeVersionsV3":', b" {}}\n"], etag='"abc"', last_modified=None)
+    cached = cache.load_fresh()
+    assert cached.etag == '"abc"'
+    assert cached.last_modified is None
+    assert 0 <= cached.age() < 5
+    assert cached.read() == b'{"runtimeVersionsV3": {}}\n'
+
+    cached = cache.load()
+    assert b"".join(cached.chunks(size=4)) == b'{"runtimeVersionsV3": {}}\n'
+
+    # Only the cache file is left behind
+    assert os.listdir(tmp_path) == ["update.cache"]
+
+
+def test_document_cache_expires(tmp_path):
+    cache = DocumentCache(str(tmp_path / "update.cache"), max_age=60)
+    cache.store([b"{}"], etag=None, last_modified="Tue, 01 Jul 2025 00:00:00 GMT", fetched_at=time.time() - 120)
+
+    assert cache.load_fresh() is None
+    cached = cache.load()
+    assert cached.last_modified == "Tue, 01 Jul 2025 00:00:00 GMT"
+    cached.close()
+
+
+def test_document_cache_ignores_corrupt_file(tmp_path):
+    path = tmp_path / "update.cache"
+    cache = DocumentCache(str(path), max_age=60)
+
+    for contents in [b"", b"no header", b"[1, 2]\n{}", b'{"etag": null}\n{}']:
+        path.write_bytes(contents)
+        assert cache.load() is None
+
+
+def test_document_cache_keeps_old_file_on_failed_write(tmp_path):
+    cache = DocumentCache(str(tmp_path / "update.cache"), max_age=60)
+    cache.store([b"{}"], etag='"old"', last_modified=None)
+
+    def chunks():
+        yield b'{"runtime'
+        raise OSError("disk full")
+
+    try:
+        cache.store(chunks(), etag='"new"', last_modified=None)
+    except OSError:
+        pass
+
+    cached = cache.load()
+    assert cached.etag == '"old"'
+    assert cached.read() == b"{}"
+    assert os.listdir(tmp_path) == ["update.cache"]
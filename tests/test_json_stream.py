@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from astronomer.airflow.version_check.json_stream import iter_object_items
+
+DOCUMENT = {
+    "features": {"nested": [1, {"tricky": 'brackets } ] { [ and "quotes"'}]},
+    "runtimeVersions": {"2.1.1": {"metadata": {"channel": "deprecated"}}},
+    "runtimeVersionsV3": {
+        "3.0-1": {"metadata": {"channel": "stable", "releaseDate": "2025-04-22", "note": "ünïcode"}},
+        "3.0-2": {"metadata": {"channel": "stable", "releaseDate": "2025-05-22", "yanked": True}},
+    },
+    "trailing": 12345,
+}
+
+
+def _chunks(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 4096])
+def test_iter_object_items_across_chunk_boundaries(indent, size):
+    data = json.dumps(DOCUMENT, indent=indent, ensure_ascii=False).encode()
+
+    items = list(iter_object_items(_chunks(data, size), "runtimeVersionsV3"))
+
+    assert items == list(DOCUMENT["runtimeVersionsV3"].items())
+
+
+def test_iter_object_items_missing_key():
+    assert list(iter_object_items([b'{"features": {}}'], "runtimeVersionsV3")) == []
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"[]", b'{"runtimeVersionsV3": []}', b'{"features": {"a": [1, 2}', b'{"runtimeVersionsV3": {"3.0-1": {}'],
+)
+def test_iter_object_items_malformed(data):
+    with pytest.raises(ValueError):
+        list(iter_object_items(_chunks(data, 3), "runtimeVersionsV3"))
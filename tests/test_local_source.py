@@ -0,0 +1,40 @@
+import pytest
+
+from astronomer.airflow.version_check.backoff import FailureKind, UpdateCheckError
+from astronomer.airflow.version_check.local_source import load_local_document, resolve_source
+
+
+def test_resolve_source_picks_last_snapshot(tmp_path):
+    for name in ["2025-05-01.json", "2025-06-01.json", ".2025-07-01.json", "README"]:
+        (tmp_path / name).write_text("{}")
+
+    assert resolve_source(str(tmp_path)) == str(tmp_path / "2025-06-01.json")
+    assert resolve_source(str(tmp_path / "2025-05-01.json")) == str(tmp_path / "2025-05-01.json")
+
+
+def test_resolve_source_without_snapshots(tmp_path):
+    with pytest.raises(UpdateCheckError):
+        resolve_source(str(tmp_path))
+
+
+def test_load_local_document_hashes_contents(tmp_path):
+    path = tmp_path / "update.json"
+    path.write_text('{"runtimeVersionsV3": {}}')
+
+    first = load_local_document(str(path))
+    assert first.etag.startswith('"sha256:')
+    assert first.read() == b'{"runtimeVersionsV3": {}}'
+
+    path.write_text('{"runtimeVersionsV3": {"3.0-1": {}}}')
+    assert load_local_document(str(path)).etag != first.etag
+
+
+@pytest.mark.parametrize("contents, kind", [(None, FailureKind.UNKNOWN), ("", FailureKind.MALFORMED)])
+def test_load_local_document_errors(tmp_path, contents, kind):
+    path = tmp_path / "update.json"
+    if contents is not None:
+        path.write_text(contents)
+
+    with pytest.raises(UpdateCheckError) as excinfo:
+        load_local_document(str(path))
+    assert excinfo.value.kind == kind
@@ -1,5 +1,17 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+
 from airflow import plugins_manager
 
+from astronomer.airflow.version_check.plugin import SCHEDULER_MODULE, when_imported
+
+# Libraries that only the update check thread, or only the UI, needs
+HEAVY_MODULES = ["requests", "distro", "semver", "flask", "alembic", SCHEDULER_MODULE]
+
 
 def test_plugin_registered():
     """Verify that the plugin is registered"""
@@ -39,3 +51,108 @@ def test_table_created(caplog, monkeypatch):
     caplog.clear()
     resetdb()
     assert "Creating VersionCheckDBManager tables from the ORM" in caplog.text
+
+
+def _modules_imported_by(code, tmp_path):
+    """Run ``code`` in a fresh interpreter, returning the modules it imports on top of Airflow's own."""
+    script = textwrap.dedent(
+        """
+        import json, sys
+        import airflow.plugins_manager
+        before = set(sys.modules)
+        {code}
+        print(json.dumps(sorted(set(sys.modules) - before)))
+        """
+    ).format(code=code)
+    env = {
+        **os.environ,
+        "AIRFLOW__DATABASE__EXTERNAL_DB_MANAGERS": (
+            "astronomer.airflow.version_check.models.manager.VersionCheckDBManager"
+        ),
+        # Any attempt to use the database fails
+        "AIRFLOW__DATABASE__SQL_ALCHEMY_CONN": f"sqlite:///{tmp_path}/missing/airflow.db",
+    }
+    result = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+def test_plugin_load_is_cheap(tmp_path):
+    """Loading the plugin, which every Airflow process does, mustn't import much or touch the database"""
+    imported = _modules_imported_by(
+        "from astronomer.airflow.version_check.plugin import AstronomerVersionCheckPlugin\n"
+        "AstronomerVersionCheckPlugin.on_load()",
+        tmp_path,
+    )
+    # The namespace packages show up here too when running from a source checkout
+    imported -= {"astronomer", "astronomer.airflow"}
+    assert imported <= {"astronomer.airflow.version_check", "astronomer.airflow.version_check.plugin"}
+
+
+def test_update_checks_import_is_cheap(tmp_path):
+    imported = _modules_imported_by("import astronomer.airflow.version_check.update_checks", tmp_path)
+    assert not imported.intersection(HEAVY_MODULES)
+    assert len(imported) < 30
+
+
+def test_when_imported(tmp_path, monkeypatch):
+    (tmp_path / "astro_when_imported_example.py").write_text("VALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    seen = []
+
+    when_imported("astro_when_imported_example", lambda module: seen.append(module.VALUE))
+    assert seen == []
+    import astro_when_imported_example  # noqa: F401
+
+    assert seen == [42]
+    # Already imported modules are passed to the callback straight away
+    when_imported("astro_when_imported_example", lambda module: seen.append(module.VALUE))
+    assert seen == [42, 42]
+
+
+def test_all_table_created(monkeypatch):
+    import sqlalchemy as sa
+    from airflow import settings
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.models.manager import VersionCheckDBManager
+    from astronomer.airflow.version_check.plugin import AstronomerVersionCheckPlugin
+
+    monkeypatch.setenv(
+        "AIRFLOW__DATABASE__EXTERNAL_DB_MANAGERS",
+        "astronomer.airflow.version_check.models.manager.VersionCheckDBManager",
+    )
+    resetdb()
+
+    statements = []
+    test_thread = threading.get_ident()
+
+    def count(conn, cursor, statement, *args):
+        # Other tests can leave Airflow components running in background threads
+        if threading.get_ident() == test_thread:
+            statements.append(statement)
+
+    sa.event.listen(settings.engine, "before_cursor_execute", count)
+    try:
+        assert AstronomerVersionCheckPlugin.all_table_created()
+        # One catalog query, and one to read the revision
+        assert len(statements) == 2
+
+        # Then the result is remembered
+        assert AstronomerVersionCheckPlugin.all_table_created()
+        assert len(statements) == 2
+    finally:
+        sa.event.remove(settings.engine, "before_cursor_execute", count)
+
+    with settings.engine.begin() as connection:
+        connection.execute(sa.text("UPDATE alembic_version_astro_version_check SET version_num = 'c7f8e9a2b3d4'"))
+    VersionCheckDBManager.invalidate_schema_cache()
+    assert not AstronomerVersionCheckPlugin.all_table_created()
+
+    with settings.engine.begin() as connection:
+        connection.execute(sa.text("DROP TABLE astro_available_version_v3"))
+    assert not AstronomerVersionCheckPlugin.all_table_created()
+
+    # Recreating the tables through the manager clears the cached result
+    resetdb()
+    assert AstronomerVersionCheckPlugin.all_table_created()
+    VersionCheckDBManager.invalidate_schema_cache()
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from airflow.utils.timezone import utcnow
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion, metadata
+from astronomer.airflow.version_check.models.replica import (
+    create_read_session,
+    dispose_read_engine,
+    get_read_engine,
+)
+from astronomer.airflow.version_check.update_checks import UpdateAvailableHelper
+
+
+@pytest.fixture
+def replica(tmp_path):
+    url = f"sqlite:///{tmp_path}/replica.db"
+    engine = create_engine(url)
+    metadata.create_all(engine)
+    with mock.patch.dict(
+        "os.environ",
+        {"AIRFLOW__ASTRONOMER__READ_SQL_ALCHEMY_CONN": url, "ASTRONOMER_RUNTIME_VERSION": "3.0-1"},
+    ):
+        yield engine
+    dispose_read_engine()
+    engine.dispose()
+
+
+def test_reads_use_airflow_session_without_replica():
+    with mock.patch("airflow.utils.session.create_session") as create_session:
+        with create_read_session() as session:
+            assert session is create_session.return_value.__enter__.return_value
+    assert get_read_engine() is None
+
+
+def test_notices_are_read_from_replica(replica, session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    with Session(replica) as replica_session:
+        replica_session.add(
+            AstronomerAvailableVersion(
+                version="3.0-1",
+                level="",
+                date_released=utcnow() - timedelta(days=100),
+                description="",
+                url="",
+                hidden_from_ui=False,
+                yanked=True,
+                end_of_maintenance=utcnow() - timedelta(days=1),
+            )
+        )
+        replica_session.commit()
+
+    helper = UpdateAvailableHelper()
+    # Only the replica knows about the release
+    assert "3.0-1" in helper.available_yanked()
+    assert helper.available_eol()["version"] == "3.0-1"
+    assert helper.version_status()["yanked"] is not None
+    assert get_read_engine() is get_read_engine()
+    assert session.query(AstronomerAvailableVersion).count() == 0
+
+    # Dismissals are written to the primary
+    session.add(AstronomerAvailableVersion(version="3.0-1", level="", date_released=utcnow(), description=""))
+    session.commit()
+    helper.dismiss_eol()
+    session.expire_all()
+    assert session.query(AstronomerAvailableVersion).get("3.0-1").eos_dismissed_until is not None
+    with Session(replica) as replica_session:
+        assert replica_session.query(AstronomerAvailableVersion).get("3.0-1").eos_dismissed_until is None
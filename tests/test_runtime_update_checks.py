@@ -1,14 +1,23 @@
+import itertools
+import json
+import os
+import threading
+import time
 from datetime import timedelta
 from unittest import mock
 
 import pytest
+from airflow.utils.session import create_session
 from airflow.utils.timezone import utcnow
 
+from astronomer.airflow.version_check.backoff import FailureKind, UpdateCheckError
 from astronomer.airflow.version_check.models.db import AstronomerAvailableVersion, AstronomerVersionCheck
 from astronomer.airflow.version_check.update_checks import (
+    NOT_MODIFIED,
     CheckThread,
     UpdateAvailableHelper,
     parse_new_version,
+    parse_version_key,
 )
 
 
@@ -346,3 +355,1150 @@ def test_available_yanked(session, image_version, yanked):
             assert image_version in result
         else:
             assert result is None
+
+
+def _update_response(status_code=200, document=None, headers=None, body=None):
+    response = mock.Mock(status_code=status_code, headers=headers or {})
+    response.json.return_value = document
+    if body is None:
+        body = json.dumps(document).encode()
+    response.content = body
+    response.iter_content.side_effect = lambda chunk_size=1, **_: (
+        body[i : i + chunk_size] for i in range(0, len(body), chunk_size)
+    )
+    return response
+
+
+def test_update_check_stores_validators_and_sends_them_back(session):
+    from airflow.utils.db import resetdb
+
+    document = {
+        "runtimeVersionsV3": {
+            "3.0-2": {
+                "metadata": {
+                    "channel": "stable",
+                    "releaseDate": "2025-06-01",
+                },
+            },
+        },
+    }
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": "3.0-1"}):
+        resetdb()
+        session.add(AstronomerVersionCheck(singleton=True))
+        session.commit()
+
+        thread = CheckThread()
+        with mock.patch("requests.get") as mock_get:
+            mock_get.return_value = _update_response(
+                document=document, headers={"ETag": '"abc"', "Last-Modified": "Sun, 01 Jun 2025 00:00:00 GMT"}
+            )
+            thread.check_for_update()
+
+        vc = AstronomerVersionCheck.get(session)
+        session.refresh(vc)
+        assert vc.etag == '"abc"'
+        assert vc.last_modified == "Sun, 01 Jun 2025 00:00:00 GMT"
+
+        AstronomerVersionCheck.reset_last_checked()
+        with mock.patch("requests.get") as mock_get, mock.patch.object(
+            CheckThread, "_process_update_json"
+        ) as mock_process:
+            mock_get.return_value = _update_response(status_code=304)
+            thread.check_for_update()
+
+        headers = mock_get.call_args.kwargs["headers"]
+        assert headers["If-None-Match"] == '"abc"'
+        assert headers["If-Modified-Since"] == "Sun, 01 Jun 2025 00:00:00 GMT"
+        mock_process.assert_not_called()
+        assert session.query(AstronomerAvailableVersion).count() == 1
+
+
+def test_update_document_is_processed_again_after_a_rollback(session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    document = {
+        "runtimeVersionsV3": {
+            version: {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}}
+            for version in ("3.0-1", "3.0-2", "3.0-3")
+        },
+    }
+
+    def get(url, headers, **kwargs):
+        # The document never changes, so the server answers any conditional request with a 304
+        if headers.get("If-None-Match") == '"v1"':
+            return _update_response(status_code=304)
+        return _update_response(document=document, headers={"ETag": '"v1"'})
+
+    def check(image_version):
+        with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": image_version}):
+            CheckThread.hide_old_versions()
+            with mock.patch("requests.get", side_effect=get) as mock_get:
+                CheckThread().check_for_update(force=True)
+            return mock_get.call_args.kwargs["headers"]
+
+    assert "If-None-Match" not in check("3.0-3")
+    assert "If-None-Match" in check("3.0-3")
+
+    # Only 3.0-3 was written for 3.0-3, so the document has to be processed again
+    assert "If-None-Match" not in check("3.0-1")
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": "3.0-1"}):
+        assert UpdateAvailableHelper().available_update()["version"] == "3.0-3"
+        session.expire_all()
+        assert session.query(AstronomerAvailableVersion).get("3.0-1") is not None
+    assert "If-None-Match" in check("3.0-1")
+
+
+def test_upsert_reports_new_versions_and_keeps_dismissals(session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    dismissed_until = utcnow() + timedelta(days=7)
+    session.add(
+        AstronomerAvailableVersion(
+            version="3.0-1",
+            level="",
+            date_released=utcnow() - timedelta(days=100),
+            description="old",
+            eos_dismissed_until=dismissed_until,
+        )
+    )
+    session.commit()
+
+    releases = [
+        AstronomerAvailableVersion(
+            version=version,
+            level="",
+            date_released=utcnow(),
+            description="new",
+            hidden_from_ui=False,
+            yanked=False,
+        )
+        for version in ("3.0-1", "3.0-2")
+    ]
+    assert AstronomerAvailableVersion.upsert(releases, session=session) == ["3.0-2"]
+    session.commit()
+    session.expire_all()
+
+    existing = session.query(AstronomerAvailableVersion).get("3.0-1")
+    assert existing.description == "new"
+    assert abs((existing.eos_dismissed_until - dismissed_until).total_seconds()) < 1
+    assert session.query(AstronomerAvailableVersion).count() == 2
+
+
+def test_changed_releases_only_returns_rows_that_differ(session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    released = utcnow() - timedelta(days=10)
+
+    def make_releases(description):
+        return [
+            AstronomerAvailableVersion(
+                version=version,
+                level="",
+                date_released=released,
+                description=description if version == "3.0-2" else "same",
+                hidden_from_ui=False,
+                yanked=False,
+            )
+            for version in ("3.0-1", "3.0-2")
+        ]
+
+    releases = make_releases("before")
+    releases_hash = AstronomerAvailableVersion.hash_releases(releases)
+    # The hash of the whole set doesn't depend on the order of the document
+    assert AstronomerAvailableVersion.hash_releases(reversed(make_releases("before"))) == releases_hash
+    assert AstronomerAvailableVersion.changed_releases(releases, session=session) == releases
+    AstronomerAvailableVersion.upsert(releases, session=session)
+    session.commit()
+
+    releases = make_releases("before")
+    assert AstronomerAvailableVersion.hash_releases(releases) == releases_hash
+    assert AstronomerAvailableVersion.changed_releases(releases, session=session) == []
+
+    releases = make_releases("after")
+    assert AstronomerAvailableVersion.hash_releases(releases) != releases_hash
+    changed = AstronomerAvailableVersion.changed_releases(releases, session=session)
+    assert [rel.version for rel in changed] == ["3.0-2"]
+
+    # The stored hashes also say which releases are new, so upsert needn't look them up again
+    from airflow import settings
+    from sqlalchemy import event
+
+    statements = []
+    test_thread = threading.get_ident()
+
+    def count(conn, cursor, statement, *args):
+        if threading.get_ident() == test_thread:
+            statements.append(statement)
+
+    releases = make_releases("again") + [
+        AstronomerAvailableVersion(version="3.0-3", level="", date_released=released, hidden_from_ui=False)
+    ]
+    AstronomerAvailableVersion.hash_releases(releases)
+    event.listen(settings.engine, "before_cursor_execute", count)
+    try:
+        stored = AstronomerAvailableVersion.stored_hashes([rel.version for rel in releases], session=session)
+        changed = AstronomerAvailableVersion.changed_releases(releases, session=session, stored=stored)
+        inserted = AstronomerAvailableVersion.upsert(changed, session=session, existing=stored.keys())
+    finally:
+        event.remove(settings.engine, "before_cursor_execute", count)
+    assert [rel.version for rel in changed] == ["3.0-2", "3.0-3"]
+    assert inserted == ["3.0-3"]
+    assert len(statements) == 2
+
+
+def test_unchanged_releases_are_not_written_again(session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    document = {
+        "runtimeVersionsV3": {
+            "3.0-2": {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}},
+            "3.0-3": {"metadata": {"channel": "stable", "releaseDate": "2025-07-01"}},
+        },
+    }
+    thread = CheckThread()
+    thread.runtime_version = "3.0-1"
+
+    with mock.patch("requests.get") as mock_get:
+        mock_get.return_value = _update_response(document=document)
+        assert thread.check_for_update()[0] == UpdateResult.SUCCESS_UPDATE_AVAIL
+
+        # Without a validator the document is fetched again, but none of it is written
+        with mock.patch.object(AstronomerAvailableVersion, "upsert") as upsert:
+            assert thread.check_for_update(force=True)[0] == UpdateResult.SUCCESS_NO_UPDATE
+        upsert.assert_not_called()
+
+        # Only the release that changed is written
+        document["runtimeVersionsV3"]["3.0-3"]["metadata"]["yanked"] = True
+        mock_get.return_value = _update_response(document=document)
+        with mock.patch.object(AstronomerAvailableVersion, "upsert", return_value=[]) as upsert:
+            assert thread.check_for_update(force=True)[0] == UpdateResult.SUCCESS_NO_UPDATE
+        (changed,), _ = upsert.call_args
+        assert [rel.version for rel in changed] == ["3.0-3"]
+
+
+def test_releases_hidden_by_an_upgrade_are_shown_again_after_a_rollback(session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    document = {
+        "runtimeVersionsV3": {
+            version: {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}}
+            for version in ("3.0-1", "3.0-2", "3.0-3")
+        },
+    }
+
+    def check(image_version):
+        with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": image_version}):
+            CheckThread.hide_old_versions()
+            thread = CheckThread()
+            with mock.patch("requests.get", return_value=_update_response(document=document)):
+                thread.check_for_update(force=True)
+        session.expire_all()
+        return session.query(AstronomerAvailableVersion).get("3.0-2").hidden_from_ui
+
+    assert check("3.0-1") is False
+    assert check("3.0-3") is True
+    # The update document hasn't changed, but the rows hidden for 3.0-3 have to be written again
+    assert check("3.0-1") is False
+
+
+@pytest.mark.parametrize(
+    "version_str, expected",
+    [
+        ("3.0-1", (3, 0, 1)),
+        ("3.0-10-nightly20241216", (3, 0, 10)),
+        ("3.1", (3, 1, 0)),
+        ("not-a-version", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_version_key(version_str, expected):
+    assert parse_version_key(version_str) == expected
+    if expected is None:
+        assert parse_new_version(version_str) is None
+    else:
+        assert parse_new_version(version_str).to_tuple()[:3] == expected
+
+
+def test_parse_new_version_is_cached():
+    parse_new_version.cache_clear()
+    assert parse_new_version("3.0-2") is parse_new_version("3.0-2")
+    assert parse_new_version.cache_info().hits == 1
+
+
+@pytest.mark.parametrize(
+    "image_version, expected",
+    [("3.0-1", "3.1-2"), ("3.1-2", "4.0-1"), ("4.0-1", "4.0-1")],
+)
+def test_available_update_prefers_latest_in_major_line(session, image_version, expected):
+    from airflow.utils.db import resetdb
+
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": image_version}):
+        resetdb()
+        for version in ("3.0-2", "3.1-2", "3.0-10", "4.0-1"):
+            session.add(
+                AstronomerAvailableVersion(
+                    version=version,
+                    level="",
+                    date_released=utcnow(),
+                    hidden_from_ui=False,
+                )
+            )
+        session.commit()
+
+        assert session.query(AstronomerAvailableVersion).get("3.0-10").patch == 10
+
+        result = UpdateAvailableHelper().available_update()
+        assert result["version"] == expected
+
+
+def test_available_update_breaks_ties_on_version(session):
+    from airflow.utils.db import resetdb
+
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": "3.0-1"}):
+        resetdb()
+        # All of these parse to (3, 0, 2)
+        for version in ("3.0-2-nightly20250601", "3.0-2-nightly20250603", "3.0-2-nightly20250602"):
+            session.add(AstronomerAvailableVersion(version=version, level="", date_released=utcnow()))
+        session.commit()
+
+        assert UpdateAvailableHelper().available_update()["version"] == "3.0-2-nightly20250603"
+
+
+def test_notices_are_cached_until_invalidated(session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.update_checks import notice_cache
+
+    image_version = "3.0-1"
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": image_version}), mock.patch.object(
+        notice_cache, "ttl", 60
+    ):
+        resetdb()
+        session.add(
+            AstronomerAvailableVersion(
+                version=image_version,
+                level="",
+                date_released=utcnow() - timedelta(days=100),
+                hidden_from_ui=False,
+                end_of_maintenance=utcnow() + timedelta(days=10),
+            )
+        )
+        session.commit()
+
+        helper = UpdateAvailableHelper()
+        assert helper.available_eol()["version"] == image_version
+
+        # Served from the cache without touching the database
+        with mock.patch("astronomer.airflow.version_check.update_checks.create_read_session") as mock_session:
+            assert helper.available_eol()["version"] == image_version
+        mock_session.assert_not_called()
+
+        # Dismissing invalidates the cache
+        helper.dismiss_eol()
+        assert helper.available_eol() is None
+
+
+def test_version_status_matches_individual_helpers(session):
+    from airflow import settings
+    from airflow.utils.db import resetdb
+    from sqlalchemy import event
+
+    image_version = "3.0-1"
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": image_version}):
+        resetdb()
+        session.add(
+            AstronomerAvailableVersion(
+                version=image_version,
+                level="",
+                date_released=utcnow() - timedelta(days=100),
+                hidden_from_ui=True,
+                end_of_maintenance=utcnow() + timedelta(days=10),
+                yanked=True,
+            )
+        )
+        session.add(
+            AstronomerAvailableVersion(version="3.0-2", level="", date_released=utcnow(), hidden_from_ui=False)
+        )
+        session.commit()
+
+        helper = UpdateAvailableHelper()
+        statements = []
+        test_thread = threading.get_ident()
+
+        def count(conn, cursor, statement, *args):
+            # Other tests can leave Airflow components running in background threads
+            if threading.get_ident() == test_thread:
+                statements.append(statement)
+
+        event.listen(settings.engine, "before_cursor_execute", count)
+        try:
+            status = helper.version_status()
+        finally:
+            event.remove(settings.engine, "before_cursor_execute", count)
+
+        assert len(statements) <= 2
+        assert status["update"]["version"] == "3.0-2"
+        assert status == {
+            "update": helper.available_update(),
+            "eol": helper.available_eol(),
+            "yanked": helper.available_yanked(),
+        }
+
+
+def test_update_check_streams_update_document(session):
+    from airflow.utils.db import resetdb
+
+    document = {
+        "features": {},
+        "runtimeVersionsV3": {
+            version: {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}}
+            for version in ("3.0-1", "3.0-2", "3.1-1")
+        },
+    }
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": "3.0-1"}):
+        resetdb()
+        session.add(AstronomerVersionCheck(singleton=True))
+        session.commit()
+
+        thread = CheckThread()
+        thread.stream_update_document = True
+        with mock.patch("requests.get") as mock_get:
+            response = _update_response(document=document)
+            mock_get.return_value = response
+            thread.check_for_update()
+
+        assert mock_get.call_args.kwargs["stream"] is True
+        response.json.assert_not_called()
+        response.close.assert_called_once()
+        recorded = {r.version for r in session.query(AstronomerAvailableVersion)}
+        assert recorded == {"3.0-1", "3.0-2", "3.1-1"}
+
+
+def test_process_update_json_only_keeps_newer_releases():
+    runtime_versions = {
+        version: {"metadata": {"channel": channel, "releaseDate": "2025-06-01"}}
+        for version, channel in [
+            ("2.9-5", "stable"),
+            ("3.0-1", "stable"),
+            ("3.0-3", "stable"),
+            ("3.0-2", "stable"),
+            ("3.1-1-nightly20250601", "alpha"),
+            ("not-a-version", "stable"),
+            ("3.0-0", "stable"),
+        ]
+    }
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": "3.0-1"}):
+        thread = CheckThread()
+        releases = list(thread._process_update_json({"runtimeVersionsV3": runtime_versions}))
+
+    assert [rel.version for rel in releases] == ["3.0-3", "3.0-2", "3.0-1"]
+    assert [rel.hidden_from_ui for rel in releases] == [False, False, True]
+
+
+def test_hide_old_versions(session):
+    from airflow.utils.db import resetdb
+
+    with mock.patch.dict("os.environ", {"ASTRONOMER_RUNTIME_VERSION": "3.1-2"}):
+        resetdb()
+        for version in ("2.9-9", "3.0-5", "3.1-1", "3.1-2", "3.1-3", "3.2-0", "4.0-1", "junk"):
+            session.add(
+                AstronomerAvailableVersion(version=version, level="", date_released=utcnow(), hidden_from_ui=False)
+            )
+        session.commit()
+
+        assert CheckThread.hide_old_versions() == 4
+
+        visible = session.query(AstronomerAvailableVersion.version).filter(
+            AstronomerAvailableVersion.hidden_from_ui.is_(False)
+        )
+        assert {v for (v,) in visible} == {"3.1-3", "3.2-0", "4.0-1", "junk"}
+        assert CheckThread.hide_old_versions() == 0
+
+
+def test_check_thread_can_be_triggered_and_stopped():
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    with mock.patch.object(CheckThread, "hide_old_versions", return_value=0), mock.patch.object(
+        CheckThread, "check_for_update", return_value=(UpdateResult.NOT_DUE, 3600)
+    ) as mock_check:
+        thread = CheckThread()
+        thread.check_interval_secs = 3600
+        thread.start()
+
+        # Cuts the start up delay short, and forces the check
+        thread.trigger_check()
+        for _ in range(50):
+            if mock_check.called:
+                break
+            time.sleep(0.1)
+        mock_check.assert_called_once_with(force=True)
+
+        thread.stop(timeout=5)
+        assert not thread.is_alive()
+        mock_check.assert_called_once()
+
+
+def test_check_thread_picks_up_checks_requested_elsewhere(session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    thread = CheckThread()
+    thread.trigger_poll_interval = 0.1
+    assert not AstronomerVersionCheck.check_requested(session)
+
+    # As another process would, through the database
+    AstronomerVersionCheck.request_check(session)
+    session.commit()
+    start = time.monotonic()
+    thread._sleep(60)
+    assert time.monotonic() - start < 5
+    assert thread._check_requested.is_set()
+
+    # Whichever process claims the next check takes the request with it
+    assert AstronomerVersionCheck.claim_check(timedelta(0), session=session)
+    session.commit()
+    assert not AstronomerVersionCheck.check_requested(session)
+
+
+def test_check_lock_contention(session):
+    from airflow import settings
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.models.lock import CheckLockContended, SQLiteFileLock, get_check_lock
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    held = get_check_lock(settings.engine)
+    assert isinstance(held, SQLiteFileLock)
+    assert held.acquire()
+    try:
+        with pytest.raises(CheckLockContended), AstronomerVersionCheck.check_lock():
+            pass
+
+        # The fetch only claims the check, it is writing the results that needs the lock
+        with mock.patch.object(CheckThread, "_get_update_json", return_value={"runtimeVersionsV3": {}}):
+            thread = CheckThread()
+            result, wake_up_in = thread.check_for_update()
+        assert result == UpdateResult.FAILURE
+        assert 0 <= wake_up_in <= 60
+        assert thread.backoff.last_failure == FailureKind.CONTENDED
+    finally:
+        held.release()
+
+    with AstronomerVersionCheck.check_lock():
+        pass
+
+
+def test_check_lock_name_depends_on_database_and_schema():
+    from sqlalchemy.engine import make_url
+
+    from astronomer.airflow.version_check.models.lock import MySQLNamedLock, lock_id, lock_name
+
+    def engine(url):
+        return mock.Mock(url=make_url(url))
+
+    names = {
+        lock_name(engine("mysql://db.example.com/airflow_a")),
+        lock_name(engine("mysql://db.example.com/airflow_b")),
+        lock_name(engine("postgresql://db.example.com/airflow"), schema="team_a"),
+        lock_name(engine("postgresql://db.example.com/airflow"), schema="team_b"),
+    }
+    assert len(names) == 4
+    assert len({lock_id(name) for name in names}) == 4
+    # MySQL lock names can be at most 64 characters
+    assert all(len(name) <= 64 for name in names)
+    assert MySQLNamedLock(engine("mysql://db.example.com/airflow_a")).name == lock_name(
+        engine("mysql://other.example.com/airflow_a")
+    )
+
+
+def test_check_lock_requires_a_supported_database():
+    from astronomer.airflow.version_check.models.lock import get_check_lock
+
+    engine = mock.Mock()
+    engine.dialect.name = "mssql"
+    with pytest.raises(ValueError, match="mssql"):
+        get_check_lock(engine)
+
+
+def test_check_for_update_fetches_outside_a_transaction(session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    thread = CheckThread()
+    thread.runtime_version = "3.0-1"
+
+    def fetch():
+        # The claim is already committed, so other sessions can see it
+        with create_session() as other:
+            row = AstronomerVersionCheck.get(other)
+            assert row.last_checked is not None
+            assert row.last_checked_by == AstronomerVersionCheck.host_identifier()
+        return {"runtimeVersionsV3": {"3.0-2": {"metadata": {"channel": "stable", "releaseDate": "2025-01-01"}}}}
+
+    with mock.patch.object(thread, "_get_update_json", side_effect=fetch):
+        result, _ = thread.check_for_update()
+    assert result == UpdateResult.SUCCESS_UPDATE_AVAIL
+    assert session.query(AstronomerAvailableVersion).count() == 1
+
+
+def test_check_for_update_discards_results_when_claim_is_lost(session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    thread = CheckThread()
+    thread.runtime_version = "3.0-1"
+
+    def fetch():
+        # Another process forces a check while we are waiting on the network
+        with create_session() as other:
+            AstronomerVersionCheck.get(other).last_checked_by = "someone-else"
+        return {"runtimeVersionsV3": {"3.0-2": {"metadata": {"channel": "stable", "releaseDate": "2025-01-01"}}}}
+
+    with mock.patch.object(thread, "_get_update_json", side_effect=fetch):
+        result, wake_up_in = thread.check_for_update()
+    assert result == UpdateResult.FAILURE
+    assert 0 <= wake_up_in <= 60
+    assert session.query(AstronomerAvailableVersion).count() == 0
+
+
+def test_check_for_update_releases_claim_on_failure(session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    thread = CheckThread()
+    with mock.patch.object(thread, "_get_update_json", side_effect=ValueError("bad document")):
+        with pytest.raises(ValueError):
+            thread.check_for_update()
+
+    session.expire_all()
+    assert AstronomerVersionCheck.get(session).last_checked is None
+
+    # So the next attempt doesn't have to wait for the check interval
+    with mock.patch.object(thread, "_get_update_json", return_value=NOT_MODIFIED):
+        result, _ = thread.check_for_update()
+    assert result == UpdateResult.SUCCESS_NO_UPDATE
+
+
+def test_check_for_update_releases_claim_when_writing_fails(session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    thread = CheckThread()
+    thread.runtime_version = "3.0-1"
+    document = {"runtimeVersionsV3": {"3.0-2": {"metadata": {"channel": "stable", "releaseDate": "2025-01-01"}}}}
+    with mock.patch.object(thread, "_get_update_json", return_value=document), mock.patch.object(
+        AstronomerAvailableVersion, "upsert", side_effect=RuntimeError("connection lost")
+    ):
+        with pytest.raises(RuntimeError):
+            thread.check_for_update()
+
+    session.expire_all()
+    assert AstronomerVersionCheck.get(session).last_checked is None
+
+
+def test_abandoned_claim_is_taken_over_once_its_lease_is_up(session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    # A process claims the check, then is killed before finishing it
+    with create_session() as other:
+        assert AstronomerVersionCheck.claim_check(timedelta(days=1), session=other)
+
+    thread = CheckThread()
+    with mock.patch.object(thread, "_get_update_json", return_value=NOT_MODIFIED) as fetch:
+        result, wake_up_in = thread.check_for_update()
+        assert result == UpdateResult.NOT_DUE
+        # Not a whole check interval
+        assert wake_up_in <= thread.claim_lease.total_seconds()
+        fetch.assert_not_called()
+
+        row = AstronomerVersionCheck.get(session)
+        row.last_checked -= thread.claim_lease
+        session.commit()
+        result, _ = thread.check_for_update()
+        assert result == UpdateResult.SUCCESS_NO_UPDATE
+
+        # Now the check has been completed, the next one is a whole interval away
+        result, wake_up_in = thread.check_for_update()
+        assert result == UpdateResult.NOT_DUE
+        assert wake_up_in > thread.claim_lease.total_seconds()
+
+
+@pytest.mark.parametrize(
+    "status_code, headers, kind, retry_after",
+    [
+        (429, {"Retry-After": "120"}, FailureKind.RATE_LIMITED, 120),
+        (429, {}, FailureKind.RATE_LIMITED, None),
+        (503, {}, FailureKind.SERVER_ERROR, None),
+        (404, {}, FailureKind.UNKNOWN, None),
+    ],
+)
+def test_get_update_json_classifies_http_errors(status_code, headers, kind, retry_after):
+    thread = CheckThread()
+    with mock.patch("requests.get") as mock_get:
+        mock_get.return_value = _update_response(status_code=status_code, headers=headers)
+        with pytest.raises(UpdateCheckError) as excinfo:
+            thread._get_update_json()
+    assert excinfo.value.kind == kind
+    assert excinfo.value.retry_after == retry_after
+
+
+def test_get_update_json_classifies_network_and_malformed_errors():
+    import requests
+
+    thread = CheckThread()
+    with mock.patch("requests.get") as mock_get:
+        mock_get.side_effect = requests.exceptions.ConnectTimeout("timed out")
+        with pytest.raises(UpdateCheckError) as excinfo:
+            thread._get_update_json()
+        assert excinfo.value.kind == FailureKind.NETWORK
+
+        mock_get.side_effect = None
+        mock_get.return_value = _update_response(body=b"<html>")
+        with pytest.raises(UpdateCheckError) as excinfo:
+            thread._get_update_json()
+        assert excinfo.value.kind == FailureKind.MALFORMED
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_get_update_json_limits_document_size(stream):
+    document = {"runtimeVersionsV3": {f"3.0-{i}": {"metadata": {"channel": "stable"}} for i in range(5000)}}
+    thread = CheckThread()
+    thread.stream_update_document = stream
+    thread.max_document_size = 64 * 1024
+    with mock.patch("requests.get") as mock_get:
+        # Refused before reading the body if the server says how large it is ...
+        mock_get.return_value = _update_response(document=document, headers={"Content-Length": "1000000"})
+        with pytest.raises(UpdateCheckError) as excinfo:
+            thread._get_update_json()
+        assert excinfo.value.kind == FailureKind.TOO_LARGE
+        mock_get.return_value.iter_content.assert_not_called()
+        mock_get.return_value.close.assert_called_once()
+
+        # ... and otherwise once it has read more than the limit
+        mock_get.return_value = _update_response(document=document)
+        with pytest.raises(UpdateCheckError) as excinfo:
+            dict(thread._get_update_json()["runtimeVersionsV3"])
+        assert excinfo.value.kind == FailureKind.TOO_LARGE
+        mock_get.return_value.close.assert_called_once()
+
+        thread.max_document_size = 0
+        assert len(dict(thread._get_update_json()["runtimeVersionsV3"])) == 5000
+
+
+def test_get_update_json_enforces_deadline():
+    document = {"runtimeVersionsV3": {f"3.0-{i}": {"metadata": {"channel": "stable"}} for i in range(5000)}}
+    thread = CheckThread()
+    thread.request_timeout = 60
+    thread.fetch_deadline = 10
+    with mock.patch("requests.get") as mock_get, mock.patch("time.monotonic") as monotonic:
+        mock_get.return_value = _update_response(document=document)
+        # Each chunk of the body takes 4 seconds to arrive
+        monotonic.side_effect = itertools.count(0, 4)
+        with pytest.raises(UpdateCheckError) as excinfo:
+            thread._get_update_json()
+    assert excinfo.value.kind == FailureKind.DEADLINE_EXCEEDED
+    # No single read may wait longer than the whole fetch is allowed to take
+    assert mock_get.call_args.kwargs["timeout"] == 10
+    assert mock_get.call_args.kwargs["stream"] is True
+
+
+def test_get_update_json_negotiates_compression():
+    import requests
+
+    from astronomer.airflow.version_check.update_checks import accepted_encodings
+
+    thread = CheckThread()
+    with mock.patch("requests.get") as mock_get:
+        mock_get.return_value = _update_response(document={}, headers={"Content-Encoding": "gzip"})
+        assert thread._get_update_json() == {}
+        assert mock_get.call_args.kwargs["headers"]["Accept-Encoding"] == ", ".join(accepted_encodings())
+        assert "gzip" in accepted_encodings()
+
+        mock_get.return_value = _update_response(document={}, headers={"Content-Encoding": "br"})
+        with pytest.raises(UpdateCheckError) as excinfo:
+            thread._get_update_json()
+        assert excinfo.value.kind == FailureKind.MALFORMED
+
+        mock_get.return_value = _update_response(document={})
+        mock_get.return_value.iter_content.side_effect = requests.exceptions.ContentDecodingError("bad gzip")
+        with pytest.raises(UpdateCheckError) as excinfo:
+            thread._get_update_json()
+        assert excinfo.value.kind == FailureKind.MALFORMED
+
+
+def test_check_for_update_classifies_malformed_document(session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    thread = CheckThread()
+    thread.runtime_version = "3.0-1"
+    with mock.patch.object(thread, "_get_update_json", return_value={"runtimeVersionsV3": {"3.0-2": {}}}):
+        with pytest.raises(UpdateCheckError) as excinfo:
+            thread.check_for_update()
+    assert excinfo.value.kind == FailureKind.MALFORMED
+
+    session.expire_all()
+    assert AstronomerVersionCheck.get(session).last_checked is None
+
+
+def test_run_backs_off_after_failures():
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    thread = CheckThread()
+    thread.check_interval_secs = 3600
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 4:
+            thread._stop_event.set()
+
+    outcomes = [
+        UpdateCheckError(FailureKind.SERVER_ERROR, "HTTP 503"),
+        UpdateCheckError(FailureKind.RATE_LIMITED, "HTTP 429", retry_after=5000),
+        (UpdateResult.SUCCESS_NO_UPDATE, 3600),
+    ]
+    failures = []
+
+    def check_for_update(force=False):
+        failures.append(thread.backoff.consecutive_failures)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        thread.backoff.success()
+        return outcome
+
+    with mock.patch.object(thread, "hide_old_versions", return_value=0), mock.patch.object(
+        thread, "_sleep", side_effect=sleep
+    ), mock.patch.object(thread, "check_for_update", side_effect=check_for_update):
+        thread.run()
+
+    # The initial delay, then one sleep per check
+    _, server_error, rate_limited, success = sleeps
+    assert 0 <= server_error <= 300
+    assert rate_limited >= 5000
+    assert success == 3600
+    assert failures == [0, 1, 2]
+    assert thread.backoff.consecutive_failures == 0
+    assert thread.backoff.last_failure is None
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_update_document_is_shared_through_node_cache(stream, tmp_path, session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.document_cache import DocumentCache
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    document = {
+        "runtimeVersionsV3": {"3.0-2": {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}}},
+    }
+
+    def make_thread():
+        thread = CheckThread()
+        thread.runtime_version = "3.0-1"
+        thread.stream_update_document = stream
+        thread.document_cache = DocumentCache(str(tmp_path / "update.cache"), max_age=3600)
+        return thread
+
+    with mock.patch("requests.get") as mock_get:
+        mock_get.return_value = _update_response(document=document, headers={"ETag": '"v1"'})
+        result, _ = make_thread().check_for_update()
+        assert result == UpdateResult.SUCCESS_UPDATE_AVAIL
+        assert mock_get.call_count == 1
+
+        # Another process on the node finds the document it has already processed
+        result, _ = make_thread().check_for_update(force=True)
+        assert result == UpdateResult.SUCCESS_NO_UPDATE
+        assert mock_get.call_count == 1
+
+        # ... or, if it hasn't seen it yet, processes it without fetching it again
+        session.query(AstronomerAvailableVersion).delete()
+        row = AstronomerVersionCheck.get(session)
+        row.etag = row.releases_hash = None
+        session.commit()
+        result, _ = make_thread().check_for_update(force=True)
+        assert result == UpdateResult.SUCCESS_UPDATE_AVAIL
+        assert mock_get.call_count == 1
+
+    session.expire_all()
+    assert AstronomerVersionCheck.get(session).etag == '"v1"'
+    assert [v.version for v in session.query(AstronomerAvailableVersion)] == ["3.0-2"]
+
+
+def test_node_cached_document_is_processed_again_for_another_runtime_version(tmp_path, session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.document_cache import DocumentCache
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    document = {
+        "runtimeVersionsV3": {
+            version: {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}} for version in ("3.0-1", "3.0-2")
+        },
+    }
+
+    def make_thread(runtime_version):
+        thread = CheckThread()
+        thread.runtime_version = runtime_version
+        thread.document_cache = DocumentCache(str(tmp_path / "update.cache"), max_age=3600)
+        return thread
+
+    with mock.patch("requests.get") as mock_get:
+        mock_get.return_value = _update_response(document=document, headers={"ETag": '"v1"'})
+        make_thread("3.0-2").check_for_update()
+        # Rolled back: the cached document has only been processed for 3.0-2
+        make_thread("3.0-1").check_for_update(force=True)
+    assert mock_get.call_count == 1
+
+    versions = {v.version for v in session.query(AstronomerAvailableVersion)}
+    assert versions == {"3.0-1", "3.0-2"}
+
+
+def test_not_modified_refreshes_node_cache(tmp_path):
+    from astronomer.airflow.version_check.document_cache import DocumentCache
+
+    cache = DocumentCache(str(tmp_path / "update.cache"), max_age=3600)
+    cache.store([b"{}"], etag='"v1"', last_modified=None, fetched_at=time.time() - 7200)
+
+    thread = CheckThread()
+    thread.document_cache = cache
+    thread.etag = '"v1"'
+    with mock.patch("requests.get") as mock_get:
+        mock_get.return_value = _update_response(status_code=304)
+        assert thread._get_update_json() is NOT_MODIFIED
+    assert mock_get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+    cached = cache.load_fresh()
+    assert cached.etag == '"v1"'
+    assert cached.read() == b"{}"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_update_check_from_local_source(stream, tmp_path, session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    def write_snapshot(name, versions):
+        document = {
+            "runtimeVersionsV3": {
+                version: {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}} for version in versions
+            }
+        }
+        (tmp_path / name).write_text(json.dumps(document))
+
+    thread = CheckThread()
+    thread.runtime_version = "3.0-1"
+    thread.stream_update_document = stream
+    thread.update_source = str(tmp_path)
+
+    write_snapshot("0001.json", ["3.0-2"])
+    with mock.patch("requests.get") as mock_get:
+        assert thread.check_for_update(force=True)[0] == UpdateResult.SUCCESS_UPDATE_AVAIL
+        assert thread.check_for_update(force=True)[0] == UpdateResult.SUCCESS_NO_UPDATE
+
+        write_snapshot("0002.json", ["3.0-2", "3.0-3"])
+        assert thread.check_for_update(force=True)[0] == UpdateResult.SUCCESS_UPDATE_AVAIL
+    mock_get.assert_not_called()
+
+    versions = {v.version for v in session.query(AstronomerAvailableVersion)}
+    assert versions == {"3.0-2", "3.0-3"}
+
+
+def test_local_source_is_processed_again_for_another_runtime_version(tmp_path, session):
+    from airflow.utils.db import resetdb
+
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    document = {
+        "runtimeVersionsV3": {
+            version: {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}} for version in ("3.0-1", "3.0-2")
+        }
+    }
+    (tmp_path / "0001.json").write_text(json.dumps(document))
+
+    def check(runtime_version):
+        thread = CheckThread()
+        thread.runtime_version = runtime_version
+        thread.update_source = str(tmp_path)
+        return thread.check_for_update(force=True)[0]
+
+    assert check("3.0-2") == UpdateResult.SUCCESS_UPDATE_AVAIL
+    # Rolled back: the snapshot hasn't changed, but has only been processed for 3.0-2
+    assert check("3.0-1") == UpdateResult.SUCCESS_UPDATE_AVAIL
+    assert check("3.0-1") == UpdateResult.SUCCESS_NO_UPDATE
+
+    versions = {v.version for v in session.query(AstronomerAvailableVersion)}
+    assert versions == {"3.0-1", "3.0-2"}
+
+
+def test_update_check_emits_metrics(session):
+    from airflow.utils.db import resetdb
+
+    resetdb()
+    session.add(AstronomerVersionCheck(singleton=True))
+    session.commit()
+
+    thread = CheckThread()
+    thread.runtime_version = "3.0-1"
+    document = {
+        "runtimeVersionsV3": {
+            version: {"metadata": {"channel": "stable", "releaseDate": "2025-06-01"}} for version in ["3.0-2", "3.0-3"]
+        }
+    }
+    with mock.patch("astronomer.airflow.version_check.update_checks.Stats") as stats, mock.patch(
+        "requests.get"
+    ) as mock_get:
+        mock_get.return_value = _update_response(document=document)
+        thread.check_for_update()
+
+        helper = UpdateAvailableHelper()
+        helper.available_update()
+        helper.available_update()
+
+    incr = [c.args for c in stats.incr.call_args_list]
+    assert ("astronomer.version_check.fetch.status.200",) in incr
+    assert ("astronomer.version_check.releases.inserted", 2) in incr
+    assert ("astronomer.version_check.releases.updated", 0) in incr
+    assert ("astronomer.version_check.check.success_update_avail",) in incr
+    assert ("astronomer.version_check.notice_cache.miss",) in incr
+    assert ("astronomer.version_check.notice_cache.hit",) in incr
+
+    gauges = {c.args[0]: c.args[1] for c in stats.gauge.call_args_list}
+    assert gauges["astronomer.version_check.releases.processed"] == 2
+    assert gauges["astronomer.version_check.fetch.response_bytes"] == len(json.dumps(document))
+
+    timers = {c.args[0] for c in stats.timer.call_args_list}
+    assert timers == {
+        "astronomer.version_check.check.duration",
+        "astronomer.version_check.fetch.duration",
+        "astronomer.version_check.notice.available_update.duration",
+    }
+    timings = {c.args[0] for c in stats.timing.call_args_list}
+    assert timings == {"astronomer.version_check.fetch.download.duration"}
+
+
+def test_check_for_update_profiling(tmp_path):
+    from astronomer.airflow.version_check.update_checks import UpdateResult
+
+    thread = CheckThread()
+    thread.profile_checks = 1
+    thread.profile_directory = str(tmp_path / "profiles")
+
+    with mock.patch.object(thread, "_check_for_update", return_value=(UpdateResult.NOT_DUE, 60)):
+        thread.check_for_update()
+        thread.check_for_update()
+
+    # Only the first check was profiled
+    assert thread.profile_checks == 0
+    files = sorted(os.listdir(tmp_path / "profiles"))
+    assert len(files) == 2
+    prof, report = files
+    assert prof.startswith("update-check-") and prof.endswith(".prof")
+    assert report == prof[: -len(".prof")] + ".txt"
+
+    text = (tmp_path / "profiles" / report).read_text()
+    assert "Peak traced memory" in text
+    assert "allocation sites" in text
+    assert "function calls" in text
+
+
+def test_host_fingerprint_is_computed_once():
+    from astronomer.airflow.version_check.update_checks import (
+        get_request_defaults,
+        get_user_string_data,
+        refresh_host_fingerprint,
+    )
+
+    refresh_host_fingerprint()
+    try:
+        with mock.patch("distro.name", return_value="Debian GNU/Linux") as distro_name, mock.patch(
+            "distro.version", return_value="12"
+        ) as distro_version, mock.patch("distro.id", return_value="debian"), mock.patch(
+            "astronomer.airflow.version_check.update_checks.sys.platform", "linux"
+        ):
+            assert get_user_string_data() is get_user_string_data()
+            headers, params = get_request_defaults("3.0-1", "http://airflow.example.com")
+            assert get_request_defaults("3.0-1", "http://airflow.example.com") == (headers, params)
+            assert distro_name.call_count == 1
+
+            assert headers["User-Agent"].startswith("airflow/3.0-1 {")
+            assert '"distro":{"id":"debian","name":"Debian GNU/Linux","version":"12"}' in headers["User-Agent"]
+            assert params == {"site": "http://airflow.example.com"}
+            with pytest.raises(TypeError):
+                headers["If-None-Match"] = '"abc"'
+
+            distro_version.return_value = "13"
+            refresh_host_fingerprint()
+            headers, _ = get_request_defaults("3.0-1", "http://airflow.example.com")
+            assert distro_name.call_count == 2
+            assert '"version":"13"' in headers["User-Agent"]
+    finally:
+        refresh_host_fingerprint()